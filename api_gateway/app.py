@@ -1,14 +1,22 @@
-from flask import Flask, request, jsonify
-import requests
+from quart import Quart, g, request, jsonify, Response
 import os
-from routes.user_routes import user_bp
+import time
+from routes.user_routes import user_bp, user_cache, user_flights
+from auth import token_cache, token_required
+from upstream import upstream_stats, close_upstreams
+from resilience import UpstreamUnavailable
+from metrics import (
+    CONTENT_TYPE_LATEST, render_metrics, request_duration, request_errors_total, requests_total,
+    request_upstream_time, start_request_timing,
+)
+from profiling import PROFILE_HEADER, SORT_KEYS, RequestProfile, profile_store
 # from routes.customer_routes import customer_bp
 # from routes.other_routes import (
 #     cart_bp, order_bp, shipping_bp, 
 #     payment_bp, product_bp
 # )
 
-app = Flask(__name__)
+app = Quart(__name__)
 
 # Đăng ký các blueprint
 app.register_blueprint(user_bp, url_prefix='/api/users')
@@ -19,18 +27,126 @@ app.register_blueprint(user_bp, url_prefix='/api/users')
 # app.register_blueprint(payment_bp, url_prefix='/api/payments')
 # app.register_blueprint(product_bp, url_prefix='/api/products')
 
+def record_request(response):
+    """
+    Records the request in /metrics and adds Server-Timing entries for the
+    gateway, after the ones forwarded from the upstream (db, app...).
+    Streamed bodies are still being sent, so this is time to headers.
+    """
+    started_at = g.get('started_at')
+    if started_at is None:
+        return
+    elapsed = time.perf_counter() - started_at
+    # Dùng mẫu route (/api/users/<user_id>) để số series không tăng theo id
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    requests_total.labels(route=route, method=request.method, status=response.status_code).inc()
+    if response.status_code >= 500:
+        request_errors_total.labels(route=route, method=request.method).inc()
+    request_duration.labels(route=route, method=request.method).observe(elapsed)
+
+    timings = [
+        f'upstream;dur={request_upstream_time() * 1000:.1f}',
+        f'gateway;dur={elapsed * 1000:.1f}',
+    ]
+    if 'Server-Timing' in response.headers:
+        timings.insert(0, response.headers['Server-Timing'])
+    response.headers['Server-Timing'] = ', '.join(timings)
+
+def record_profile(response):
+    profile = g.get('profile')
+    if profile is None:
+        return
+    response.headers['X-Gateway-Profile-Id'] = profile.save({
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'route': request.url_rule.rule if request.url_rule else 'unmatched',
+        'status': response.status_code,
+        'created_at': time.time(),
+    })
+
+@app.before_request
+async def start_timer():
+    g.started_at = time.perf_counter()
+    start_request_timing()
+    # Không profile chính các endpoint đọc profile
+    if request.endpoint not in ('list_profiles', 'get_profile'):
+        g.profile = RequestProfile.start(request.headers.get(PROFILE_HEADER))
+
+@app.teardown_request
+async def stop_profile(exc):
+    # Request lỗi không qua after_request vẫn phải tắt profiler và nhả lock
+    profile = g.get('profile')
+    if profile is not None:
+        profile.stop()
+
 # Cấu hình CORS
 @app.after_request
-def after_request(response):
+async def after_request(response):
+    record_request(response)
+    record_profile(response)
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
+# Backend lỗi hoặc circuit đang mở: trả 503 ngay thay vì giữ request
+@app.errorhandler(UpstreamUnavailable)
+async def upstream_unavailable(error):
+    response = jsonify({'message': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+# Đóng các kết nối upstream khi worker dừng
+@app.after_serving
+async def shutdown():
+    await close_upstreams()
+
 @app.route('/health', methods=['GET'])
-def health_check():
+async def health_check():
     return jsonify({"status": "healthy", "service": "api_gateway"})
 
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    return Response(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+@app.route('/profiles', methods=['GET'])
+@token_required
+async def list_profiles(current_user):
+    # Profile CPU của gateway (profiling.py), mới nhất trước; profile của user_service ở /api/users/profiles
+    if current_user.get('user_type') != 'ADMIN':
+        return jsonify({'message': 'Chỉ admin được xem profile hiệu năng'}), 403
+    return jsonify(profile_store.list())
+
+@app.route('/profiles/<profile_id>', methods=['GET'])
+@token_required
+async def get_profile(current_user, profile_id):
+    # ?output=text (mặc định): các hàm tốn thời gian nhất theo ?sort=; ?output=pstats: tải file gốc
+    if current_user.get('user_type') != 'ADMIN':
+        return jsonify({'message': 'Chỉ admin được xem profile hiệu năng'}), 403
+    output = request.args.get('output', 'text')
+    sort = request.args.get('sort', 'cumulative')
+    if output not in ('text', 'pstats') or sort not in SORT_KEYS:
+        return jsonify({'message': f"output must be text or pstats, sort one of: {', '.join(SORT_KEYS)}"}), 400
+    path = profile_store.stats_path(profile_id)
+    if path is None:
+        return jsonify({'message': 'Profile not found'}), 404
+    if output == 'pstats':
+        with open(path, 'rb') as f:
+            return Response(f.read(), content_type='application/octet-stream', headers={
+                'Content-Disposition': f'attachment; filename="{profile_id}.prof"',
+            })
+    return Response(profile_store.summary(profile_id, sort), content_type='text/plain; charset=utf-8')
+
+@app.route('/stats', methods=['GET'])
+async def stats():
+    return jsonify({
+        "token_cache": token_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "user_flights": user_flights.stats(),
+        "upstreams": upstream_stats(),
+    })
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=True, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,138 @@
+from quart import request, jsonify
+import os
+import hashlib
+import time
+from functools import wraps
+import jwt
+from cache import TTLCache
+from upstream import user_service
+
+# Cấu hình JWT, phải khớp với SIMPLE_JWT của user_service
+JWT_VERIFY_MODE = os.environ.get('JWT_VERIFY_MODE', 'local')  # 'local' hoặc 'remote'
+JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
+JWT_SIGNING_KEY = os.environ.get('JWT_SIGNING_KEY', os.environ.get('SECRET_KEY', ''))
+# Các khoá cũ vẫn được chấp nhận trong thời gian xoay vòng khoá (phân tách bằng dấu phẩy)
+JWT_PREVIOUS_SIGNING_KEYS = [
+    key.strip() for key in os.environ.get('JWT_PREVIOUS_SIGNING_KEYS', '').split(',') if key.strip()
+]
+JWT_REMOTE_FALLBACK = os.environ.get('JWT_REMOTE_FALLBACK', 'True') == 'True'
+JWT_USER_ID_CLAIM = os.environ.get('JWT_USER_ID_CLAIM', 'user_id')
+JWT_LEEWAY = int(os.environ.get('JWT_LEEWAY', 0))
+
+# Cache các token đã xác thực để không phải xác thực lại trong cùng một phiên
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300))
+
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+
+class TokenInvalid(Exception):
+    pass
+
+
+def signing_keys():
+    """
+    Returns the keys accepted for signature verification, current key first.
+    """
+    return [key for key in [JWT_SIGNING_KEY] + JWT_PREVIOUS_SIGNING_KEYS if key]
+
+
+def verify_token_locally(token):
+    """
+    Validates the signature and expiry of an access token and builds
+    current_user from its claims. Returns None when none of the configured
+    keys match, so the caller can fall back to the remote check.
+    """
+    for key in signing_keys():
+        try:
+            claims = jwt.decode(
+                token, key,
+                algorithms=[JWT_ALGORITHM],
+                options={'require': ['exp']},
+                leeway=JWT_LEEWAY,
+            )
+        except jwt.InvalidSignatureError:
+            continue
+        except jwt.PyJWTError as e:
+            raise TokenInvalid(str(e))
+
+        if claims.get('token_type', 'access') != 'access' or JWT_USER_ID_CLAIM not in claims:
+            raise TokenInvalid('Token has wrong type')
+        return {
+            'id': claims[JWT_USER_ID_CLAIM],
+            'email': claims.get('email'),
+            'user_type': claims.get('user_type'),
+        }
+    return None
+
+
+async def verify_token_remotely(token):
+    # Gửi token đến user_service để xác thực
+    auth_response = await user_service.post(
+        "/api/users/verify-token/",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    if auth_response.status_code != 200:
+        raise TokenInvalid('Token is invalid!')
+    return auth_response.json()
+
+
+def token_cache_key(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_lifetime(token):
+    """
+    Seconds until the token's `exp`, read without verifying the signature.
+    Only used to bound how long an already verified token stays cached.
+    """
+    try:
+        claims = jwt.decode(token, options={'verify_signature': False})
+        return claims['exp'] - time.time()
+    except (jwt.PyJWTError, KeyError, TypeError):
+        return 0
+
+
+async def verify_token(token):
+    key = token_cache_key(token)
+    current_user = token_cache.get(key)
+    if current_user is not None:
+        return current_user
+
+    current_user = await _verify_token(token)
+    # Không bao giờ giữ token trong cache lâu hơn thời hạn `exp` của nó
+    token_cache.set(key, current_user, ttl=token_lifetime(token))
+    return current_user
+
+
+async def _verify_token(token):
+    if JWT_VERIFY_MODE == 'local' and signing_keys():
+        current_user = verify_token_locally(token)
+        if current_user is not None:
+            return current_user
+        if not JWT_REMOTE_FALLBACK:
+            raise TokenInvalid('Token is invalid!')
+    return await verify_token_remotely(token)
+
+
+def get_bearer_token():
+    parts = request.headers.get('Authorization', '').split()
+    if len(parts) == 2 and parts[0] == 'Bearer':
+        return parts[1]
+    return None
+
+
+def token_required(f):
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        token = get_bearer_token()
+        if not token:
+            return jsonify({'message': 'Token is missing!'}), 401
+
+        try:
+            current_user = await verify_token(token)
+        except TokenInvalid:
+            return jsonify({'message': 'Token is invalid!'}), 401
+        # UpstreamUnavailable được app chuyển thành 503 ngay, không chờ timeout
+        return await f(current_user, *args, **kwargs)
+    return decorated
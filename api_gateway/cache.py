@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry expiry and a bounded number of entries.
+    """
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class ResponseCache:
+    """
+    Read-through cache for idempotent upstream GETs.
+
+    Every key embeds a per-path generation. Invalidating a path bumps its
+    generation so existing entries become unreachable at once, and a GET that
+    started before a write can never store its stale result under the new one.
+    """
+    def __init__(self, maxsize=1024, ttl=30):
+        self.ttl = ttl
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+        self.invalidations = 0
+        self.stores = 0
+        self.hit_age_total = 0.0
+        self.hit_age_max = 0.0
+
+    def generation(self, path):
+        return self._generations.get(path, (0, 0))[0]
+
+    def key(self, path, generation, *vary):
+        return (path, generation) + vary
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry['stored_at']
+        with self._lock:
+            self.hit_age_total += age
+            self.hit_age_max = max(self.hit_age_max, age)
+        return entry
+
+    def set(self, key, status, headers, body):
+        path, generation = key[0], key[1]
+        # Bỏ qua nếu path đã bị invalidate trong lúc đang gọi upstream
+        if generation != self.generation(path):
+            return
+        self.entries.set(key, {
+            'status': status,
+            'headers': headers,
+            'body': body,
+            'stored_at': time.monotonic(),
+        })
+        with self._lock:
+            self.stores += 1
+
+    def invalidate(self, path):
+        now = time.monotonic()
+        with self._lock:
+            self._counter += 1
+            self._generations[path] = (self._counter, now)
+            self.invalidations += 1
+            # Generation cũ hơn TTL không còn entry nào dùng tới, có thể xoá
+            if len(self._generations) > self.entries.maxsize:
+                self._generations = {
+                    p: g for p, g in self._generations.items() if now - g[1] < self.ttl
+                }
+
+    def stats(self):
+        stats = self.entries.stats()
+        with self._lock:
+            stats.update({
+                'ttl': self.ttl,
+                'stores': self.stores,
+                'invalidations': self.invalidations,
+                'avg_hit_age': round(self.hit_age_total / self.entries.hits, 4) if self.entries.hits else 0.0,
+                'max_hit_age': round(self.hit_age_max, 4),
+            })
+        return stats
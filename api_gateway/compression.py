@@ -0,0 +1,106 @@
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli là tuỳ chọn, thiếu thì chỉ dùng gzip
+    brotli = None
+
+# Body nhỏ hơn ngưỡng này không đáng để nén
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 4))
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+
+def accepted_encodings(accept_encoding):
+    """
+    Parses an Accept-Encoding header into {coding: q}.
+    """
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    accepted = accepted_encodings(accept_encoding)
+    wildcard = accepted.get('*', 0)
+    for coding in (('br', 'gzip') if brotli else ('gzip',)):
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def is_compressible(headers, size=None):
+    """
+    True when a response with these headers may be compressed: not already
+    encoded, a text-like type, and not known to be below COMPRESS_MIN_SIZE.
+    """
+    if headers.get('Content-Encoding'):
+        return False
+    if not headers.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+        return False
+    return size is None or size >= COMPRESS_MIN_SIZE
+
+
+class Compressor:
+    """
+    Incremental compressor; every chunk is flushed so a streamed body
+    reaches the client as it is produced.
+    """
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: định dạng gzip
+
+    def compress(self, chunk):
+        if self.encoding == 'br':
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def add_vary(headers, value):
+    vary = [v.strip() for v in headers.get('Vary', '').split(',') if v.strip()]
+    if value.lower() not in (v.lower() for v in vary):
+        vary.append(value)
+    headers['Vary'] = ', '.join(vary)
+
+
+def weak_etag(etag):
+    # Body đã nén khác byte với bản gốc nên ETag mạnh phải chuyển thành yếu
+    return etag if etag.startswith('W/') else f'W/{etag}'
+
+
+def encoded_headers(headers, encoding):
+    headers = dict(headers)
+    headers.pop('Content-Length', None)
+    headers['Content-Encoding'] = encoding
+    if 'ETag' in headers:
+        headers['ETag'] = weak_etag(headers['ETag'])
+    add_vary(headers, 'Accept-Encoding')
+    return headers
@@ -0,0 +1,49 @@
+from contextvars import ContextVar
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+
+# Registry riêng: /metrics chỉ xuất các metric của gateway
+registry = CollectorRegistry()
+
+# Bucket (giây) cho độ trễ request và lời gọi upstream
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+requests_total = Counter(
+    'gateway_requests_total', 'Requests handled by the gateway.', ['route', 'method', 'status'],
+    registry=registry,
+)
+request_errors_total = Counter(
+    'gateway_request_errors_total', 'Requests answered with a 5xx status.', ['route', 'method'],
+    registry=registry,
+)
+request_duration = Histogram(
+    'gateway_request_duration_seconds', 'Time until the response headers are ready.', ['route', 'method'],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+upstream_duration = Histogram(
+    'gateway_upstream_request_duration_seconds',
+    'Upstream call latency including retries, until the response headers arrive.',
+    ['upstream', 'method', 'outcome'], buckets=LATENCY_BUCKETS, registry=registry,
+)
+
+# Tổng thời gian chờ upstream của request hiện tại, dùng cho Server-Timing
+_upstream_time = ContextVar('upstream_time', default=None)
+
+
+def start_request_timing():
+    _upstream_time.set([0.0])
+
+
+def add_upstream_time(seconds):
+    total = _upstream_time.get()
+    if total is not None:
+        total[0] += seconds
+
+
+def request_upstream_time():
+    total = _upstream_time.get()
+    return total[0] if total is not None else 0.0
+
+
+def render_metrics():
+    return generate_latest(registry)
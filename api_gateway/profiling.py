@@ -0,0 +1,59 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+
+# shared/ nằm ở thư mục gốc của repo khi chạy từ source; trong image nó được copy vào /app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.profiling import PROFILE_HEADER, SORT_KEYS, ProfileStore, wants_profile  # noqa: E402,F401
+
+# Profile CPU theo mẫu: tỉ lệ lấy mẫu, hoặc header X-Profile mang đúng PROFILING_TOKEN (để trống là tắt)
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(os.path.dirname(__file__), 'profiles'))
+PROFILING_KEEP = int(os.environ.get('PROFILING_KEEP', 50))
+
+# Chỉ profile một request tại một thời điểm, request khác chạy bình thường
+_active = threading.Lock()
+
+
+profile_store = ProfileStore(PROFILING_DIR, PROFILING_KEEP)
+
+
+class RequestProfile:
+    """
+    cProfile of one gateway request, from before_request until the response
+    headers are ready. The event loop keeps serving other requests while
+    this one awaits the upstream, so their handlers show up in the profile
+    too; the upstream;dur entry of Server-Timing tells how much was waiting.
+    """
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.running = True
+        self.profiler.enable()
+
+    @classmethod
+    def start(cls, header):
+        if (
+            not wants_profile(header, PROFILING_TOKEN, PROFILING_SAMPLE_RATE)
+            or not _active.acquire(blocking=False)
+        ):
+            return None
+        try:
+            return cls()
+        except BaseException:
+            _active.release()
+            raise
+
+    def stop(self):
+        if self.running:
+            self.profiler.disable()
+            self.running = False
+            _active.release()
+        return time.perf_counter() - self.started
+
+    def save(self, meta):
+        elapsed = self.stop()
+        return profile_store.save(self.profiler, {**meta, 'duration_ms': round(elapsed * 1000, 2)})
@@ -0,0 +1,231 @@
+from quart import request, Response
+from werkzeug.http import parse_date
+from compression import (
+    Compressor, add_vary, choose_encoding, compress, encoded_headers, is_compressible,
+)
+
+# Header của client được chuyển tiếp sang upstream
+FORWARD_REQUEST_HEADERS = (
+    'Authorization', 'Content-Type', 'Accept', 'If-None-Match', 'If-Modified-Since', 'X-Profile',
+)
+# Header của upstream được trả lại cho client, body giữ nguyên không giải mã
+FORWARD_RESPONSE_HEADERS = (
+    'Content-Type', 'Content-Encoding', 'Content-Length', 'ETag', 'Last-Modified',
+    'Cache-Control', 'Vary', 'Location', 'WWW-Authenticate', 'Retry-After', 'Allow',
+    'Content-Disposition', 'Server-Timing', 'X-Profile-Id',
+)
+
+
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+# Header giữ lại trong response 304
+NOT_MODIFIED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+
+def upstream_request_headers(conditional=True):
+    headers = {
+        name: request.headers[name]
+        for name in FORWARD_REQUEST_HEADERS
+        if name in request.headers and (conditional or name not in CONDITIONAL_HEADERS)
+    }
+    # Gateway tự nén theo Accept-Encoding của client, upstream luôn trả body gốc
+    headers['Accept-Encoding'] = 'identity'
+    # Để upstream tạo link (ví dụ cursor phân trang) trỏ về gateway
+    headers['X-Forwarded-Host'] = request.host
+    headers['X-Forwarded-Proto'] = request.scheme
+    return headers
+
+
+def response_headers(upstream_response):
+    return {
+        name: upstream_response.headers[name]
+        for name in FORWARD_RESPONSE_HEADERS if name in upstream_response.headers
+    }
+
+
+async def proxy(upstream, method, path):
+    """
+    Forwards the current request to `upstream` and streams the upstream body
+    back to the client chunk by chunk, without parsing or re-encoding it.
+    """
+    body = await request.get_data()
+    upstream_response = await upstream.stream(
+        method, path,
+        params=request.query_string.decode(),
+        headers=upstream_request_headers(),
+        content=body or None,
+    )
+
+    return streaming_response(upstream_response)
+
+
+def streaming_response(upstream_response):
+    headers = response_headers(upstream_response)
+    size = headers.get('Content-Length')
+    encoding = None
+    if upstream_response.status_code == 200 and is_compressible(headers, size and int(size)):
+        add_vary(headers, 'Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        headers = encoded_headers(headers, encoding)
+
+    async def body_chunks():
+        compressor = Compressor(encoding) if encoding else None
+        try:
+            async for chunk in upstream_response.aiter_raw():
+                yield compressor.compress(chunk) if compressor else chunk
+            if compressor:
+                yield compressor.finish()
+        finally:
+            await upstream_response.aclose()
+
+    return Response(body_chunks(), status=upstream_response.status_code, headers=headers)
+
+
+def etag_matches(if_none_match, etag):
+    # So sánh yếu (RFC 7232): bỏ qua tiền tố W/
+    if if_none_match.strip() == '*':
+        return True
+    candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return etag.removeprefix('W/') in candidates
+
+
+def is_not_modified(entry):
+    """
+    Evaluates the client's conditional headers against a buffered 200
+    entry, so cached and coalesced responses can still answer 304.
+    """
+    if entry['status'] != 200:
+        return False
+    headers = entry['headers']
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return 'ETag' in headers and etag_matches(if_none_match, headers['ETag'])
+    if_modified_since = parse_date(request.headers.get('If-Modified-Since'))
+    last_modified = parse_date(headers.get('Last-Modified'))
+    return bool(if_modified_since and last_modified and last_modified <= if_modified_since)
+
+
+def buffered_response(entry):
+    """
+    Builds the client response for a buffered entry: 304 when the client's
+    copy is current, otherwise the body, compressed when worth it.
+    """
+    headers = dict(entry['headers'])
+    if is_not_modified(entry):
+        return Response(b'', status=304, headers={
+            name: headers[name] for name in NOT_MODIFIED_HEADERS if name in headers
+        })
+
+    body = entry['body']
+    if entry['status'] == 200 and is_compressible(headers, len(body)):
+        add_vary(headers, 'Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding:
+            body = compress(body, encoding)
+            headers = encoded_headers(headers, encoding)
+    headers['Content-Length'] = str(len(body))
+    return Response(body, status=entry['status'], headers=headers)
+
+
+async def fetch(upstream, path, etag=None):
+    """
+    Sends the current GET upstream and buffers the whole response so it can
+    be shared between coalesced callers or stored in a cache. The client's
+    conditional headers are not forwarded: the full entry is fetched and
+    its conditions are evaluated by buffered_response(). `etag` revalidates
+    a stored entry instead (the upstream may then answer 304).
+    """
+    headers = upstream_request_headers(conditional=False)
+    if etag:
+        headers['If-None-Match'] = etag
+    upstream_response = await upstream.stream(
+        'GET', path,
+        params=request.query_string.decode(),
+        headers=headers,
+    )
+    try:
+        body = await upstream_response.aread()
+    finally:
+        await upstream_response.aclose()
+    return {
+        'status': upstream_response.status_code,
+        'headers': response_headers(upstream_response),
+        'body': body,
+    }
+
+
+def flight_key(path, generation=None):
+    """
+    Callers share a flight only when they would send the same upstream
+    request: same path, query and forwarded headers (Authorization, Accept,
+    X-Profile, ...). `generation` is the cache generation of `path`, so a
+    GET arriving after a write never joins a read started before it.
+    """
+    headers = tuple(sorted(upstream_request_headers(conditional=False).items()))
+    return ('GET', path, request.query_string, generation, headers)
+
+
+async def coalesced_proxy(upstream, path, flights):
+    """
+    Proxies a GET, sharing one upstream call between all identical requests
+    (see flight_key) that arrive while it is in flight.
+    """
+    entry = await flights.do(flight_key(path), lambda: fetch(upstream, path))
+    return buffered_response(entry)
+
+
+def needs_revalidation(headers):
+    # no-cache (user_service gửi kèm ETag): chỉ dùng lại sau khi upstream xác nhận bằng 304
+    return 'no-cache' in headers.get('Cache-Control', '')
+
+
+def is_cacheable(entry, max_body):
+    return (
+        entry['status'] == 200
+        and 'no-store' not in entry['headers'].get('Cache-Control', '')
+        and ('ETag' in entry['headers'] or not needs_revalidation(entry['headers']))
+        and len(entry['body']) <= max_body
+    )
+
+
+def cached_response(entry, status):
+    response = buffered_response(entry)
+    # Server-Timing và profile của lần gọi upstream ban đầu không thuộc về request này
+    response.headers.pop('Server-Timing', None)
+    response.headers.pop('X-Profile-Id', None)
+    response.headers['X-Cache'] = status
+    return response
+
+
+async def cached_proxy(upstream, path, cache, scope, flights, max_body=64 * 1024):
+    """
+    Serves a GET from `cache` when possible, otherwise fetches it through
+    `flights` and stores small successful responses. `scope` must identify
+    what the caller is allowed to see, since the upstream filters by role.
+    Entries the upstream marked no-cache are revalidated with their ETag on
+    every hit, with the caller's own credentials, and the stored body is
+    only served after a 304.
+    """
+    if 'no-cache' in request.headers.get('Cache-Control', ''):
+        return await proxy(upstream, 'GET', path)
+
+    # Cache lưu body gốc; nén và 304 được xử lý riêng cho từng client
+    generation = cache.generation(path)
+    key = cache.key(path, generation, scope, request.query_string)
+    entry = cache.get(key)
+    if entry is not None and not needs_revalidation(entry['headers']):
+        return cached_response(entry, 'HIT')
+
+    if entry is not None:
+        etag = entry['headers']['ETag']
+        fresh = await flights.do(flight_key(path, generation) + (etag,), lambda: fetch(upstream, path, etag))
+        if fresh['status'] == 304:
+            return cached_response(entry, 'REVALIDATED')
+        entry = fresh
+    else:
+        entry = await flights.do(flight_key(path, generation), lambda: fetch(upstream, path))
+    if is_cacheable(entry, max_body):
+        cache.set(key, entry['status'], entry['headers'], entry['body'])
+    response = buffered_response(entry)
+    response.headers['X-Cache'] = 'MISS'
+    return response
@@ -0,0 +1,129 @@
+import threading
+import time
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised when an upstream call is rejected by its circuit breaker or fails
+    after every allowed attempt. Turned into a fast 503 by the app.
+    """
+    def __init__(self, upstream, reason, retry_after=1):
+        super().__init__(f"{upstream} is unavailable: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `recovery_timeout` seconds, then lets up to `half_open_max_calls` probes
+    through. A successful probe closes the circuit, a failed one re-opens it.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=10, half_open_max_calls=1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.opens = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.recovery_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self.opened_at = now
+                self.probes = 0
+            if self.state == self.HALF_OPEN:
+                # Probe bị huỷ giữa chừng sẽ không báo kết quả, nên cấp lại lượt sau mỗi chu kỳ
+                if now - self.opened_at >= self.recovery_timeout:
+                    self.opened_at = now
+                    self.probes = 0
+                if self.probes >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self.probes += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opens += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def retry_after(self):
+        return max(1, int(self.recovery_timeout - (time.monotonic() - self.opened_at)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'opens': self.opens,
+                'rejected': self.rejected,
+            }
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of overall traffic: every
+    request deposits `ratio` tokens, every retry spends one. A small
+    time-based refill keeps retries possible at low request rates.
+    """
+    def __init__(self, ratio=0.2, min_per_second=5, max_tokens=100):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated_at = time.monotonic()
+        self.retries = 0
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, amount):
+        now = time.monotonic()
+        amount += (now - self.updated_at) * self.min_per_second
+        self.tokens = min(self.max_tokens, self.tokens + amount)
+        self.updated_at = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            self._refill(0)
+            if self.tokens < 1:
+                self.exhausted += 1
+                return False
+            self.tokens -= 1
+            self.retries += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tokens': round(self.tokens, 2),
+                'retries': self.retries,
+                'exhausted': self.exhausted,
+            }
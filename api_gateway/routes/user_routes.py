@@ -1,98 +1,91 @@
-from flask import Blueprint, request, jsonify
-import requests
+from quart import Blueprint
 import os
-from functools import wraps
-import jwt
+from auth import token_required
+from cache import ResponseCache
+from proxy import proxy, cached_proxy, coalesced_proxy
+from singleflight import SingleFlight
+from upstream import user_service
 
 user_bp = Blueprint('user_bp', __name__)
 
-USER_SERVICE_URL = os.environ.get('USER_SERVICE_URL', 'http://user_service:8000')
+# Cache cho GET /api/users/<id>, phân biệt theo caller_scope vì user_service lọc theo user_type
+user_cache = ResponseCache(
+    maxsize=int(os.environ.get('USER_CACHE_SIZE', 10000)),
+    ttl=int(os.environ.get('USER_CACHE_TTL', 30)),
+)
+# Gộp các GET giống nhau đang chờ upstream thành một request duy nhất
+user_flights = SingleFlight()
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(' ')[1]
-        if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
-        
-        try:
-            # Gửi token đến user_service để xác thực
-            auth_response = requests.post(
-                f"{USER_SERVICE_URL}/api/users/verify-token/",
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            if auth_response.status_code != 200:
-                return jsonify({'message': 'Token is invalid!'}), 401
-            
-            current_user = auth_response.json()
-            return f(current_user, *args, **kwargs)
-        except Exception as e:
-            return jsonify({'message': str(e)}), 500
-    return decorated
+
+def caller_scope(current_user):
+    """
+    What user_service filters the response by: the caller's role, plus the
+    caller's id for CUSTOMER (who only sees themselves). Callers with the
+    same scope get the same response, so they share cache entries.
+    """
+    user_type = current_user.get('user_type')
+    return (user_type, current_user.get('id') if user_type == 'CUSTOMER' else None)
 
 @user_bp.route('/', methods=['GET'])
 @token_required
-def get_all_users(current_user):
-    response = requests.get(
-        f"{USER_SERVICE_URL}/api/users/",
-        headers={"Authorization": request.headers.get('Authorization')}
-    )
-    return jsonify(response.json()), response.status_code
+async def get_all_users(current_user):
+    return await coalesced_proxy(user_service, "/api/users/", user_flights)
+
+# Link next/previous của user_service có dấu / ở cuối, cả hai dạng đều phải dùng được
+@user_bp.route('/search', methods=['GET'])
+@user_bp.route('/search/', methods=['GET'])
+@token_required
+async def search_users(current_user):
+    return await coalesced_proxy(user_service, "/api/users/search/", user_flights)
+
+@user_bp.route('/export', methods=['GET'])
+@user_bp.route('/export/', methods=['GET'])
+@token_required
+async def export_users(current_user):
+    # Stream thẳng từ user_service, không buffer toàn bộ file trong gateway
+    return await proxy(user_service, 'GET', "/api/users/export/")
+
+@user_bp.route('/profiles', methods=['GET'])
+@token_required
+async def list_profiles(current_user):
+    return await proxy(user_service, 'GET', "/api/users/profiles/")
+
+@user_bp.route('/profiles/<profile_id>', methods=['GET'])
+@token_required
+async def get_profile(current_user, profile_id):
+    return await proxy(user_service, 'GET', f"/api/users/profiles/{profile_id}/")
 
 @user_bp.route('/', methods=['POST'])
-def create_user():
-    data = request.json
-    response = requests.post(
-        f"{USER_SERVICE_URL}/api/users/",
-        json=data
-    )
-    return jsonify(response.json()), response.status_code
+async def create_user():
+    return await proxy(user_service, 'POST', "/api/users/")
 
 @user_bp.route('/<user_id>', methods=['GET'])
 @token_required
-def get_user(current_user, user_id):
-    response = requests.get(
-        f"{USER_SERVICE_URL}/api/users/{user_id}/",
-        headers={"Authorization": request.headers.get('Authorization')}
+async def get_user(current_user, user_id):
+    return await cached_proxy(
+        user_service, f"/api/users/{user_id}/", user_cache, caller_scope(current_user), user_flights
     )
-    return jsonify(response.json()), response.status_code
 
 @user_bp.route('/<user_id>', methods=['PUT'])
 @token_required
-def update_user(current_user, user_id):
-    data = request.json
-    response = requests.put(
-        f"{USER_SERVICE_URL}/api/users/{user_id}/",
-        json=data,
-        headers={"Authorization": request.headers.get('Authorization')}
-    )
-    return jsonify(response.json()), response.status_code
+async def update_user(current_user, user_id):
+    try:
+        return await proxy(user_service, 'PUT', f"/api/users/{user_id}/")
+    finally:
+        user_cache.invalidate(f"/api/users/{user_id}/")
 
 @user_bp.route('/<user_id>', methods=['DELETE'])
 @token_required
-def delete_user(current_user, user_id):
-    response = requests.delete(
-        f"{USER_SERVICE_URL}/api/users/{user_id}/",
-        headers={"Authorization": request.headers.get('Authorization')}
-    )
-    return jsonify(response.json()), response.status_code
+async def delete_user(current_user, user_id):
+    try:
+        return await proxy(user_service, 'DELETE', f"/api/users/{user_id}/")
+    finally:
+        user_cache.invalidate(f"/api/users/{user_id}/")
 
 @user_bp.route('/login', methods=['POST'])
-def login():
-    data = request.json
-    response = requests.post(
-        f"{USER_SERVICE_URL}/api/users/login/",
-        json=data
-    )
-    return jsonify(response.json()), response.status_code
+async def login():
+    return await proxy(user_service, 'POST', "/api/users/login/")
 
 @user_bp.route('/register', methods=['POST'])
-def register():
-    data = request.json
-    response = requests.post(
-        f"{USER_SERVICE_URL}/api/users/register/",
-        json=data
-    )
-    return jsonify(response.json()), response.status_code
\ No newline at end of file
+async def register():
+    return await proxy(user_service, 'POST', "/api/users/register/")
\ No newline at end of file
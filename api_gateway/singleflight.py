@@ -0,0 +1,40 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into one call; every waiter
+    receives the result (or exception) of the call already in flight. The
+    call keeps running when the caller that started it is cancelled.
+    """
+    def __init__(self):
+        self._calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            # Lời gọi chung chạy trong task riêng nên không thuộc về caller nào
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.leaders += 1
+        else:
+            self.followers += 1
+        # shield: một caller bị huỷ (client ngắt kết nối) không huỷ lời gọi của các caller khác
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Đánh dấu exception đã được xử lý khi mọi caller đều đã bị huỷ
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {
+            'in_flight': len(self._calls),
+            'leaders': self.leaders,
+            'followers': self.followers,
+        }
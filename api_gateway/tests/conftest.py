@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+import time
+import httpx
+import jwt
+import pytest
+
+# Các module của gateway import lẫn nhau theo tên (from upstream import ...), như khi chạy app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Cấu hình đọc lúc import, phải đặt trước khi import app/auth
+os.environ.setdefault('JWT_SIGNING_KEY', 'test-key')
+os.environ.setdefault('JWT_PREVIOUS_SIGNING_KEYS', 'old-key')
+os.environ.setdefault('USER_SERVICE_URL', 'http://user-service.test')
+
+import upstream  # noqa: E402
+from auth import token_cache  # noqa: E402
+from resilience import RetryBudget  # noqa: E402
+from routes.user_routes import user_cache, user_flights  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_token(user_id=1, user_type='ADMIN', key='test-key', lifetime=300, **claims):
+    payload = {
+        'user_id': user_id, 'user_type': user_type, 'token_type': 'access',
+        'exp': int(time.time()) + lifetime, **claims,
+    }
+    return jwt.encode(payload, key, algorithm='HS256')
+
+
+def auth_headers(**kwargs):
+    return {'Authorization': f'Bearer {make_token(**kwargs)}'}
+
+
+class MockUpstream:
+    """
+    Stands in for user_service behind an httpx MockTransport. `handler`
+    receives each httpx.Request and returns an httpx.Response (or raises);
+    every request is kept in `calls`.
+    """
+    def __init__(self):
+        self.calls = []
+        self.handler = lambda request: httpx.Response(200, json={})
+
+    async def __call__(self, request):
+        self.calls.append(request)
+        response = self.handler(request)
+        if asyncio.iscoroutine(response):
+            response = await response
+        # httpx.Response(content=...) đã được đọc sẵn; trả lại dạng stream như response từ mạng
+        return httpx.Response(
+            response.status_code, headers=response.headers, stream=httpx.ByteStream(response.content),
+        )
+
+    def paths(self):
+        return [(request.method, request.url.path) for request in self.calls]
+
+
+@pytest.fixture
+def mock_upstream(monkeypatch):
+    mock = MockUpstream()
+    client = upstream.user_service
+    monkeypatch.setattr(client, 'transport', httpx.MockTransport(mock))
+    # Client httpx gắn với event loop; mỗi test chạy asyncio.run riêng nên tạo client mới
+    monkeypatch.setattr(client, '_client', None)
+    monkeypatch.setattr(client, 'breaker', type(client.breaker)(failure_threshold=5, recovery_timeout=10))
+    monkeypatch.setattr(upstream, 'retry_budget', RetryBudget())
+    token_cache.clear()
+    user_cache.entries.clear()
+    yield mock
+    token_cache.clear()
+    user_cache.entries.clear()
+    assert user_flights.stats()['in_flight'] == 0
@@ -0,0 +1,64 @@
+import time
+import httpx
+import pytest
+import auth
+from auth import TokenInvalid, token_cache, token_cache_key, verify_token
+from conftest import make_token, run
+
+
+def verified_user(request):
+    assert request.headers['Authorization'].startswith('Bearer ')
+    return httpx.Response(200, json={'id': 7, 'email': 'remote@example.com', 'user_type': 'STAFF'})
+
+
+def test_current_and_previous_keys_are_accepted_locally(mock_upstream):
+    for key in ('test-key', 'old-key'):
+        user = run(verify_token(make_token(user_id=3, user_type='MANAGER', key=key)))
+        assert user == {'id': 3, 'email': None, 'user_type': 'MANAGER'}
+    assert mock_upstream.calls == []
+
+
+def test_unknown_key_falls_back_to_user_service(mock_upstream):
+    mock_upstream.handler = verified_user
+    user = run(verify_token(make_token(key='rotated-elsewhere')))
+    assert user['id'] == 7
+    assert mock_upstream.paths() == [('POST', '/api/users/verify-token/')]
+
+
+def test_remote_rejection_and_disabled_fallback(mock_upstream, monkeypatch):
+    mock_upstream.handler = lambda request: httpx.Response(401, json={})
+    with pytest.raises(TokenInvalid):
+        run(verify_token(make_token(key='unknown')))
+
+    monkeypatch.setattr(auth, 'JWT_REMOTE_FALLBACK', False)
+    mock_upstream.calls.clear()
+    with pytest.raises(TokenInvalid):
+        run(verify_token(make_token(key='unknown-too')))
+    assert mock_upstream.calls == []
+
+
+def test_expired_and_wrong_type_tokens_are_rejected(mock_upstream):
+    with pytest.raises(TokenInvalid):
+        run(verify_token(make_token(lifetime=-10)))
+    with pytest.raises(TokenInvalid):
+        run(verify_token(make_token(token_type='refresh')))
+
+
+def test_token_cache_ttl_is_bounded_by_exp(mock_upstream):
+    token = make_token(lifetime=2)
+    run(verify_token(token))
+    _, expires_at = token_cache._data[token_cache_key(token)]
+    assert expires_at - time.monotonic() <= 2
+    # Token dài hạn vẫn bị giới hạn bởi TTL của cache
+    long_lived = make_token(lifetime=10 ** 6)
+    run(verify_token(long_lived))
+    _, expires_at = token_cache._data[token_cache_key(long_lived)]
+    assert expires_at - time.monotonic() <= token_cache.ttl
+
+
+def test_cached_token_skips_verification(mock_upstream):
+    mock_upstream.handler = verified_user
+    token = make_token(key='unknown')
+    run(verify_token(token))
+    run(verify_token(token))
+    assert len(mock_upstream.calls) == 1
@@ -0,0 +1,29 @@
+import time
+from cache import ResponseCache, TTLCache
+
+
+def test_ttl_cache_evicts_lru_and_expires():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+    # TTL riêng không vượt quá TTL của cache, TTL <= 0 thì không lưu
+    cache.set('short', 1, ttl=0.01)
+    cache.set('expired', 1, ttl=0)
+    time.sleep(0.02)
+    assert cache.get('short') is None and cache.get('expired') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_response_cache_ignores_results_from_an_old_generation():
+    cache = ResponseCache(maxsize=10, ttl=60)
+    key = cache.key('/api/users/5/', cache.generation('/api/users/5/'), 'scope')
+    cache.invalidate('/api/users/5/')
+    cache.set(key, 200, {}, b'stale')
+    assert cache.get(key) is None
+    fresh = cache.key('/api/users/5/', cache.generation('/api/users/5/'), 'scope')
+    cache.set(fresh, 200, {}, b'fresh')
+    assert cache.get(fresh)['body'] == b'fresh'
+    assert cache.stats()['stores'] == 1
@@ -0,0 +1,219 @@
+import asyncio
+import gzip
+import json
+import brotli
+import httpx
+import upstream
+from app import app
+from conftest import auth_headers, run
+from routes.user_routes import user_flights
+
+USER = json.dumps({'id': 5, 'first_name': 'An', 'orders': ['x' * 40] * 100}).encode()
+HEADERS = {
+    'Content-Type': 'application/json',
+    'ETag': '"v1"',
+    'Last-Modified': 'Sun, 18 Oct 2026 10:00:00 GMT',
+}
+
+
+def user_response(request, body=USER):
+    return httpx.Response(200, headers=HEADERS, content=body)
+
+
+async def get(client, path, **headers):
+    response = await client.get(path, headers={**auth_headers(), **headers})
+    return response, await response.get_data()
+
+
+def test_cache_hit_and_conditional_get(mock_upstream):
+    mock_upstream.handler = user_response
+
+    async def scenario():
+        client = app.test_client()
+        first, body = await get(client, '/api/users/5')
+        assert (first.status_code, first.headers['X-Cache'], body) == (200, 'MISS', USER)
+        second, body = await get(client, '/api/users/5', **{'If-None-Match': '"v1"'})
+        assert (second.status_code, second.headers['X-Cache'], body) == (304, 'HIT', b'')
+        assert second.headers['ETag'] == '"v1"'
+        third, _ = await get(client, '/api/users/5', **{'If-Modified-Since': HEADERS['Last-Modified']})
+        assert third.status_code == 304
+
+    run(scenario())
+    assert len(mock_upstream.calls) == 1
+    # Header điều kiện không được gửi lên upstream, gateway tự đánh giá trên bản đầy đủ
+    assert 'If-None-Match' not in mock_upstream.calls[0].headers
+
+
+def test_no_cache_entry_is_revalidated_with_its_etag(mock_upstream):
+    versions = {'current': '"v1"'}
+
+    def handler(request):
+        etag = versions['current']
+        if request.headers.get('If-None-Match') == etag:
+            return httpx.Response(304, headers={'ETag': etag})
+        body = json.dumps({'version': etag}).encode()
+        return httpx.Response(200, headers={
+            'Content-Type': 'application/json', 'ETag': etag, 'Cache-Control': 'private, no-cache',
+        }, content=body)
+    mock_upstream.handler = handler
+
+    async def scenario():
+        client = app.test_client()
+        await get(client, '/api/users/5')
+        second, body = await get(client, '/api/users/5')
+        assert (second.status_code, second.headers['X-Cache']) == (200, 'REVALIDATED')
+        assert json.loads(body) == {'version': '"v1"'}
+        # Upstream đã đổi version: không được trả bản cũ trong cache
+        versions['current'] = '"v2"'
+        third, body = await get(client, '/api/users/5')
+        assert (third.headers['X-Cache'], json.loads(body)) == ('MISS', {'version': '"v2"'})
+        fourth, _ = await get(client, '/api/users/5')
+        assert fourth.headers['X-Cache'] == 'REVALIDATED'
+
+    run(scenario())
+    conditions = [request.headers.get('If-None-Match') for request in mock_upstream.calls]
+    assert conditions == [None, '"v1"', '"v1"', '"v2"']
+
+
+def test_gzip_and_brotli_encoding(mock_upstream):
+    mock_upstream.handler = user_response
+
+    async def scenario():
+        client = app.test_client()
+        response, body = await get(client, '/api/users/5', **{'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['ETag'] == 'W/"v1"'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(body) == USER
+        response, body = await get(client, '/api/users/5', **{'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == 'br'
+        assert brotli.decompress(body) == USER
+        # Stream (Cache-Control: no-cache) cũng được nén
+        response, body = await get(client, '/api/users/5', **{'Accept-Encoding': 'gzip', 'Cache-Control': 'no-cache'})
+        assert gzip.decompress(body) == USER
+        response, body = await get(client, '/api/users/5')
+        assert 'Content-Encoding' not in response.headers and body == USER
+
+    run(scenario())
+    assert {request.headers['Accept-Encoding'] for request in mock_upstream.calls} == {'identity'}
+
+
+def test_write_during_inflight_get_is_not_cached(mock_upstream):
+    events = {}
+    bodies = iter([b'{"first_name": "old"}', b'{"first_name": "new"}'])
+
+    async def handler(request):
+        if request.method == 'PUT':
+            return httpx.Response(200, json={})
+        # GET đầu tiên đọc dữ liệu cũ rồi bị giữ lại cho đến khi PUT xong
+        body = next(bodies)
+        if body == b'{"first_name": "old"}':
+            events['arrived'].set()
+            await events['release'].wait()
+        return httpx.Response(200, headers={'Content-Type': 'application/json'}, content=body)
+    mock_upstream.handler = handler
+
+    async def scenario():
+        # Event phải được tạo trong event loop của asyncio.run
+        events.update(arrived=asyncio.Event(), release=asyncio.Event())
+        client = app.test_client()
+        slow_get = asyncio.ensure_future(get(client, '/api/users/5'))
+        await events['arrived'].wait()
+        update = await client.put('/api/users/5', headers=auth_headers(), json={'first_name': 'new'})
+        assert update.status_code == 200
+        events['release'].set()
+        stale, body = await slow_get
+        assert body == b'{"first_name": "old"}'
+        fresh, body = await get(client, '/api/users/5')
+        assert (fresh.headers['X-Cache'], body) == ('MISS', b'{"first_name": "new"}')
+
+    run(scenario())
+
+
+def test_open_breaker_returns_503_with_retry_after(mock_upstream):
+    breaker = upstream.user_service.breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    async def scenario():
+        response, _ = await get(app.test_client(), '/api/users/')
+        assert response.status_code == 503
+        assert int(response.headers['Retry-After']) >= 1
+
+    run(scenario())
+    assert mock_upstream.calls == []
+
+
+def test_identical_gets_share_one_upstream_call(mock_upstream):
+    async def slow(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, headers={'Content-Type': 'application/json'}, content=b'[]')
+    mock_upstream.handler = slow
+
+    async def scenario():
+        client = app.test_client()
+        headers = auth_headers(user_id=1)
+        responses = await asyncio.gather(*(client.get('/api/users/', headers=headers) for _ in range(5)))
+        assert {response.status_code for response in responses} == {200}
+        # Token khác hoặc Accept khác gửi lên upstream request khác nên không dùng chung
+        await asyncio.gather(
+            client.get('/api/users/', headers=auth_headers(user_id=2)),
+            client.get('/api/users/', headers={**headers, 'Accept': 'text/html'}),
+            client.get('/api/users/', headers=headers),
+        )
+
+    run(scenario())
+    assert len(mock_upstream.calls) == 4
+
+
+def test_get_after_write_does_not_join_older_flight(mock_upstream):
+    events = {}
+    bodies = iter([b'{"v": "old"}', b'{"v": "new"}'])
+
+    async def handler(request):
+        if request.method == 'PUT':
+            return httpx.Response(200, json={})
+        body = next(bodies)
+        if body == b'{"v": "old"}':
+            events['arrived'].set()
+            await events['release'].wait()
+        return httpx.Response(200, headers={'Content-Type': 'application/json'}, content=body)
+    mock_upstream.handler = handler
+
+    async def scenario():
+        events.update(arrived=asyncio.Event(), release=asyncio.Event())
+        client = app.test_client()
+        slow_get = asyncio.ensure_future(get(client, '/api/users/5'))
+        await events['arrived'].wait()
+        await client.put('/api/users/5', headers=auth_headers(), json={'v': 'new'})
+        # GET sau khi ghi xong không được nhập vào flight đọc dữ liệu trước khi ghi
+        _, body = await get(client, '/api/users/5')
+        assert body == b'{"v": "new"}'
+        events['release'].set()
+        await slow_get
+        cached, body = await get(client, '/api/users/5')
+        assert (cached.headers['X-Cache'], body) == ('HIT', b'{"v": "new"}')
+
+    run(scenario())
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'entry'
+
+    async def scenario():
+        leader = asyncio.ensure_future(user_flights.do('key', fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(user_flights.do('key', fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == 'entry'
+        assert leader.cancelled()
+
+    run(scenario())
+    assert calls == [1]
+    assert user_flights.stats()['in_flight'] == 0
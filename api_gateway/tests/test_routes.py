@@ -0,0 +1,69 @@
+import httpx
+from app import app
+from conftest import auth_headers, run
+
+
+def test_routes_forward_authorization_and_status(mock_upstream):
+    mock_upstream.handler = lambda request: httpx.Response(404, json={'detail': 'Not found.'})
+    headers = auth_headers()
+
+    async def scenario():
+        client = app.test_client()
+        response = await client.get('/api/users/5', headers=headers)
+        assert response.status_code == 404
+        assert await response.get_json() == {'detail': 'Not found.'}
+
+    run(scenario())
+    assert mock_upstream.paths() == [('GET', '/api/users/5/')]
+    assert mock_upstream.calls[0].headers['Authorization'] == headers['Authorization']
+
+
+def test_missing_token_is_rejected_at_the_gateway(mock_upstream):
+    async def scenario():
+        response = await app.test_client().get('/api/users/')
+        assert response.status_code == 401
+
+    run(scenario())
+    assert mock_upstream.calls == []
+
+
+def test_body_and_headers_pass_through_without_reparsing(mock_upstream):
+    # Khoảng trắng không chuẩn: nếu gateway parse rồi serialize lại thì body sẽ khác
+    body = b'{"results":  [],\n "next": null}'
+    mock_upstream.handler = lambda request: httpx.Response(200, headers={
+        'Content-Type': 'application/json', 'ETag': '"v1"', 'X-Internal': 'secret',
+    }, content=body)
+
+    async def scenario():
+        response = await app.test_client().get('/api/users/?cursor=abc', headers=auth_headers())
+        assert await response.get_data() == body
+        assert response.headers['ETag'] == '"v1"'
+        assert 'X-Internal' not in response.headers
+
+    run(scenario())
+    request = mock_upstream.calls[0]
+    assert request.url.query == b'cursor=abc'
+    # Client không gửi Accept-Encoding thì upstream không được nén
+    assert request.headers['Accept-Encoding'] == 'identity'
+
+
+def test_empty_delete_response(mock_upstream):
+    mock_upstream.handler = lambda request: httpx.Response(204)
+
+    async def scenario():
+        response = await app.test_client().delete('/api/users/5', headers=auth_headers())
+        assert (response.status_code, await response.get_data()) == (204, b'')
+
+    run(scenario())
+    assert mock_upstream.paths() == [('DELETE', '/api/users/5/')]
+
+
+def test_search_and_export_accept_trailing_slash(mock_upstream):
+    async def scenario():
+        client = app.test_client()
+        for path in ('/api/users/search', '/api/users/search/', '/api/users/export', '/api/users/export/'):
+            response = await client.get(f'{path}?q=an', headers=auth_headers())
+            assert response.status_code == 200, path
+
+    run(scenario())
+    assert mock_upstream.paths() == [('GET', '/api/users/search/')] * 2 + [('GET', '/api/users/export/')] * 2
@@ -0,0 +1,65 @@
+import httpx
+import pytest
+import upstream
+from conftest import run
+from resilience import RetryBudget, UpstreamUnavailable
+
+
+def responses(*statuses):
+    statuses = list(statuses)
+    return lambda request: httpx.Response(statuses.pop(0) if len(statuses) > 1 else statuses[0])
+
+
+def test_idempotent_request_is_retried_on_retryable_status(mock_upstream):
+    mock_upstream.handler = responses(503, 502, 200)
+    response = run(upstream.user_service.get('/api/users/'))
+    assert response.status_code == 200
+    assert len(mock_upstream.calls) == 3
+    assert upstream.retry_budget.stats()['retries'] == 2
+
+
+def test_post_is_not_retried(mock_upstream):
+    mock_upstream.handler = responses(503, 200)
+    response = run(upstream.user_service.post('/api/users/login/'))
+    assert response.status_code == 503
+    assert len(mock_upstream.calls) == 1
+
+
+def test_connection_errors_raise_unavailable_after_retries(mock_upstream):
+    def refuse(request):
+        raise httpx.ConnectError('connection refused', request=request)
+    mock_upstream.handler = refuse
+    with pytest.raises(UpstreamUnavailable) as error:
+        run(upstream.user_service.get('/api/users/'))
+    assert error.value.reason == 'ConnectError'
+    assert len(mock_upstream.calls) == upstream.user_service.max_retries + 1
+
+
+def test_exhausted_retry_budget_stops_retries(mock_upstream, monkeypatch):
+    monkeypatch.setattr(upstream, 'retry_budget', RetryBudget(ratio=0, min_per_second=0, max_tokens=1))
+    mock_upstream.handler = responses(503)
+    assert run(upstream.user_service.get('/api/users/')).status_code == 503
+    # Token duy nhất dùng cho lần retry đầu, lần thứ hai bị chặn bởi ngân sách
+    assert len(mock_upstream.calls) == 2
+    assert upstream.retry_budget.stats()['exhausted'] == 1
+
+
+def test_open_breaker_rejects_without_calling_upstream(mock_upstream):
+    mock_upstream.handler = responses(503)
+    breaker = upstream.user_service.breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    with pytest.raises(UpstreamUnavailable) as error:
+        run(upstream.user_service.get('/api/users/'))
+    assert error.value.reason == 'circuit open'
+    assert mock_upstream.calls == []
+
+
+def test_requests_share_one_client_and_base_url(mock_upstream):
+    before = upstream.user_service.stats()['requests']
+    run(upstream.user_service.get('/api/users/'))
+    run(upstream.user_service.post('/api/users/login/', json={}))
+    assert mock_upstream.paths() == [('GET', '/api/users/'), ('POST', '/api/users/login/')]
+    assert all(request.url.host == 'user-service.test' for request in mock_upstream.calls)
+    stats = upstream.user_service.stats()
+    assert (stats['requests'] - before, stats['in_flight']) == (2, 0)
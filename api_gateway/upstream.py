@@ -0,0 +1,215 @@
+import os
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+import httpx
+from metrics import add_upstream_time, upstream_duration
+from resilience import CircuitBreaker, RetryBudget, UpstreamUnavailable
+
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 100))
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 2))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 10))
+# Thời gian tối đa chờ một kết nối rảnh khi pool đã đầy
+UPSTREAM_POOL_TIMEOUT = float(os.environ.get('UPSTREAM_POOL_TIMEOUT', 5))
+# Tổng thời gian cho một lời gọi upstream, tính cả các lần retry
+UPSTREAM_DEADLINE = float(os.environ.get('UPSTREAM_DEADLINE', 15))
+UPSTREAM_MAX_RETRIES = int(os.environ.get('UPSTREAM_MAX_RETRIES', 2))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_RECOVERY_TIMEOUT = float(os.environ.get('BREAKER_RECOVERY_TIMEOUT', 10))
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+RETRYABLE_STATUS = {502, 503, 504}
+
+# Ngân sách retry dùng chung cho mọi upstream, tránh bão retry khi backend quá tải
+retry_budget = RetryBudget(
+    ratio=float(os.environ.get('RETRY_BUDGET_RATIO', 0.2)),
+    min_per_second=float(os.environ.get('RETRY_BUDGET_MIN_PER_SECOND', 5)),
+)
+
+
+class UpstreamClient:
+    """
+    Non-blocking keep-alive HTTP client for one upstream service, backed by a
+    bounded connection pool shared by every gateway route.
+    """
+    def __init__(self, name, base_url, pool_size=UPSTREAM_POOL_SIZE,
+                 connect_timeout=UPSTREAM_CONNECT_TIMEOUT, read_timeout=UPSTREAM_READ_TIMEOUT,
+                 pool_timeout=UPSTREAM_POOL_TIMEOUT, deadline=UPSTREAM_DEADLINE,
+                 max_retries=UPSTREAM_MAX_RETRIES, transport=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout, pool=pool_timeout)
+        self.deadline = deadline
+        self.max_retries = max_retries
+        # Transport tuỳ chọn của httpx (ví dụ MockTransport trong test)
+        self.transport = transport
+        self.breaker = CircuitBreaker(
+            failure_threshold=BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=BREAKER_RECOVERY_TIMEOUT,
+        )
+        self._client = None
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.waits = 0
+        self.errors = 0
+
+    @property
+    def client(self):
+        # Tạo client khi cần để nó gắn với event loop đang chạy của worker
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+            )
+        return self._client
+
+    @contextmanager
+    def _track(self):
+        if self.in_flight >= self.pool_size:
+            self.waits += 1
+        self.in_flight += 1
+        self.requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        except (httpx.HTTPError, asyncio.TimeoutError):
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def send(self, method, path, stream=False, **kwargs):
+        """
+        Sends a request within the upstream deadline, guarded by the circuit
+        breaker. Idempotent methods are retried on connection errors and
+        502/503/504 while the shared retry budget allows it. Raises
+        UpstreamUnavailable instead of waiting on a backend that is down.
+        """
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = await self._send(method, path, stream, **kwargs)
+            outcome = f'{response.status_code // 100}xx'
+            return response
+        except UpstreamUnavailable:
+            outcome = 'unavailable'
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            upstream_duration.labels(upstream=self.name, method=method, outcome=outcome).observe(elapsed)
+            add_upstream_time(elapsed)
+
+    async def _send(self, method, path, stream, **kwargs):
+        deadline = time.monotonic() + self.deadline
+        retry_budget.deposit()
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise UpstreamUnavailable(self.name, 'circuit open', self.breaker.retry_after())
+
+            response = None
+            try:
+                with self._track():
+                    upstream_request = self.client.build_request(method, path, **kwargs)
+                    response = await asyncio.wait_for(
+                        self.client.send(upstream_request, stream=stream),
+                        max(deadline - time.monotonic(), 0),
+                    )
+            except (httpx.TransportError, asyncio.TimeoutError) as e:
+                error = e
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    return response
+                error = None
+
+            self.breaker.record_failure()
+            backoff = min(0.05 * 2 ** attempt, 1) * random.uniform(0.5, 1)
+            can_retry = (
+                method in IDEMPOTENT_METHODS
+                and attempt < self.max_retries
+                and time.monotonic() + backoff < deadline
+                and retry_budget.withdraw()
+            )
+            if not can_retry:
+                if response is not None:
+                    return response
+                raise UpstreamUnavailable(self.name, type(error).__name__) from error
+
+            if response is not None:
+                await response.aclose()
+            attempt += 1
+            await asyncio.sleep(backoff)
+
+    async def request(self, method, path, **kwargs):
+        return await self.send(method, path, **kwargs)
+
+    async def stream(self, method, path, **kwargs):
+        """
+        Sends a request and returns as soon as the response headers arrive.
+        The caller reads the body incrementally and must close the response.
+        """
+        return await self.send(method, path, stream=True, **kwargs)
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.request('PUT', path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.request('DELETE', path, **kwargs)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self):
+        return {
+            'pool_size': self.pool_size,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'saturation': round(self.in_flight / self.pool_size, 4),
+            'requests': self.requests,
+            'waits': self.waits,
+            'errors': self.errors,
+            'circuit': self.breaker.stats(),
+        }
+
+
+_clients = {}
+
+
+def register_upstream(name, base_url, **kwargs):
+    _clients[name] = UpstreamClient(name, base_url, **kwargs)
+    return _clients[name]
+
+
+def upstream_stats():
+    stats = {name: client.stats() for name, client in _clients.items()}
+    stats['retry_budget'] = retry_budget.stats()
+    return stats
+
+
+async def close_upstreams():
+    for client in _clients.values():
+        await client.close()
+
+
+user_service = register_upstream(
+    'user_service',
+    os.environ.get('USER_SERVICE_URL', 'http://user_service:8000'),
+)
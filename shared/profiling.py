@@ -0,0 +1,97 @@
+# Dùng chung cho gateway và user_service; mỗi service giữ phần cấu hình và cách profile request trong profiling.py của mình
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID = re.compile(r'^\d+-[0-9a-f]{8}$')
+SORT_KEYS = ('cumulative', 'tottime', 'calls')
+
+
+def wants_profile(header, token, sample_rate):
+    """
+    True when the request carries the profiling token in X-Profile, or is
+    picked by the sampling rate. Costs one random() call when sampling is on.
+    """
+    if header and token and hmac.compare_digest(header, token):
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+class ProfileStore:
+    """
+    Bounded on-disk ring of request profiles: each entry is a pstats dump
+    plus a JSON file with the request metadata. Ids start with the creation
+    time, so once more than `keep` entries exist the oldest are removed.
+    """
+    def __init__(self, directory, keep):
+        self.directory = directory
+        self.keep = keep
+
+    def _path(self, profile_id, suffix):
+        return os.path.join(self.directory, f'{profile_id}.{suffix}')
+
+    def ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted((name[:-5] for name in names if name.endswith('.json')), reverse=True)
+
+    def save(self, profiler, meta):
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f'{time.time_ns()}-{uuid.uuid4().hex[:8]}'
+        # Ghi file tạm rồi rename để không ai đọc được profile ghi dở
+        tmp = self._path(profile_id, 'tmp')
+        profiler.dump_stats(tmp)
+        os.replace(tmp, self._path(profile_id, 'prof'))
+        with open(tmp, 'w') as f:
+            json.dump({'id': profile_id, **meta}, f)
+        os.replace(tmp, self._path(profile_id, 'json'))
+        self.prune()
+        return profile_id
+
+    def prune(self):
+        for profile_id in self.ids()[self.keep:]:
+            for suffix in ('json', 'prof'):
+                try:
+                    os.remove(self._path(profile_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list(self):
+        entries = []
+        for profile_id in self.ids():
+            meta = self.meta(profile_id)
+            if meta is not None:
+                entries.append(meta)
+        return entries
+
+    def meta(self, profile_id):
+        if not PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id, 'json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def stats_path(self, profile_id):
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = self._path(profile_id, 'prof')
+        return path if os.path.exists(path) else None
+
+    def summary(self, profile_id, sort='cumulative', limit=50):
+        path = self.stats_path(profile_id)
+        if path is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
@@ -0,0 +1,77 @@
+import threading
+from django.db.backends.mysql.base import Database, DatabaseWrapper as MySQLDatabaseWrapper
+from .pool import ConnectionPool, PoolTimeout
+
+# alias -> (cấu hình tạo ra pool, pool)
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias):
+    entry = _pools.get(alias)
+    return entry and entry[1]
+
+
+def pool_stats():
+    return {alias: pool.stats() for alias, (_, pool) in _pools.items()}
+
+
+def connect(conn_params):
+    # Như MySQLDatabaseWrapper.get_new_connection, nhưng pool không giữ tham chiếu tới wrapper
+    connection = Database.connect(**conn_params)
+    if connection.encoders.get(bytes) is bytes:
+        connection.encoders.pop(bytes)
+    return connection
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    """
+    MySQL backend that checks connections out of a per-alias ConnectionPool
+    instead of opening one per request. Pool options come from the
+    database's POOL setting (SIZE, TIMEOUT, MAX_LIFETIME, PING_INTERVAL).
+    The pool is rebuilt when the connection params or POOL options of the
+    alias change (e.g. the test runner switching NAME to test_*).
+    """
+    connection_pool = None
+
+    def pool(self, conn_params):
+        options = self.settings_dict.get('POOL', {})
+        config = (
+            tuple(sorted((name, repr(value)) for name, value in conn_params.items())),
+            tuple(sorted(options.items())),
+        )
+        with _pools_lock:
+            current = _pools.get(self.alias)
+            if current is None or current[0] != config:
+                if current is not None:
+                    current[1].close()
+                params = dict(conn_params)
+                _pools[self.alias] = (config, ConnectionPool(
+                    lambda: connect(params),
+                    size=options.get('SIZE', 10),
+                    timeout=options.get('TIMEOUT', 5),
+                    max_lifetime=options.get('MAX_LIFETIME', 1800),
+                    ping_interval=options.get('PING_INTERVAL', 30),
+                ))
+            return _pools[self.alias][1]
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool(conn_params)
+        try:
+            connection = pool.acquire()
+        except PoolTimeout as e:
+            raise Database.OperationalError(str(e)) from e
+        # Trả connection về đúng pool đã tạo ra nó, kể cả khi alias đã có pool mới
+        self.connection_pool = pool
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self.connection_pool
+        if pool is None:
+            return super()._close()
+        # Đóng trong atomic block: Django vẫn giữ tham chiếu tới connection nên không trả về pool
+        reusable = not self.in_atomic_block and not self.errors_occurred
+        with self.wrap_database_errors:
+            pool.release(self.connection, reusable=reusable)
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of raw DB-API connections shared by every
+    thread of the process.
+
+    Connections idle for longer than `ping_interval` are pinged before being
+    handed out, and connections older than `max_lifetime` are replaced, so a
+    MySQL restart or `wait_timeout` never surfaces as a request error.
+    """
+    def __init__(self, connect, size=10, timeout=5, max_lifetime=1800, ping_interval=30):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self._idle = deque()
+        self._created_at = {}
+        self._cond = threading.Condition()
+        self.closed = False
+        self.in_use = 0
+        self.created = 0
+        self.discarded = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+
+    def acquire(self):
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    item = self._idle.pop()
+                    break
+                if self.in_use + len(self._idle) < self.size:
+                    item = None
+                    break
+                if not waited:
+                    waited = True
+                    self.waits += 1
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f'No database connection available after {self.timeout}s')
+                self._cond.wait(remaining)
+            self.in_use += 1
+            if waited:
+                self.wait_time += time.monotonic() - started
+
+        try:
+            connection = self._validate(item) if item is not None else None
+            if connection is None:
+                connection = self.connect()
+                with self._cond:
+                    self.created += 1
+                    self._created_at[id(connection)] = time.monotonic()
+            return connection
+        except Exception:
+            with self._cond:
+                self.in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _validate(self, item):
+        connection, last_used = item
+        now = time.monotonic()
+        created_at = self._created_at.get(id(connection), 0)
+        if now - created_at > self.max_lifetime:
+            self._discard(connection)
+            return None
+        if now - last_used > self.ping_interval:
+            try:
+                connection.ping()
+            except Exception:
+                self._discard(connection)
+                return None
+        return connection
+
+    def release(self, connection, reusable=True):
+        reusable = reusable and not self.closed
+        if reusable:
+            try:
+                # Không để transaction dở dang lọt sang request khác
+                connection.rollback()
+            except Exception:
+                reusable = False
+        if not reusable:
+            self._discard(connection)
+        with self._cond:
+            self.in_use -= 1
+            if reusable:
+                self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        """
+        Closes the idle connections; connections still in use are closed
+        when released.
+        """
+        with self._cond:
+            self.closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        for connection in idle:
+            self._discard(connection)
+
+    def _discard(self, connection):
+        with self._cond:
+            self.discarded += 1
+            self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'created': self.created,
+                'discarded': self.discarded,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_time': round(self.wait_time, 4),
+            }
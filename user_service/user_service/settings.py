@@ -1,10 +1,22 @@
 import os
+import sys
 from pathlib import Path
-import pymysql
 
-pymysql.install_as_MySQLdb()
+# Driver MySQL: 'mysqlclient' (C, nhanh hơn), 'pymysql' (thuần Python) hoặc 'auto'
+DB_DRIVER = os.environ.get('DB_DRIVER', 'auto')
+if DB_DRIVER == 'pymysql':
+    import pymysql
+    pymysql.install_as_MySQLdb()
+elif DB_DRIVER == 'auto':
+    try:
+        import MySQLdb  # noqa: F401
+    except ImportError:
+        import pymysql
+        pymysql.install_as_MySQLdb()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
+# shared/ (dùng chung với gateway) nằm ở thư mục gốc của repo khi chạy từ source; trong image nó được copy vào /app
+sys.path.append(str(BASE_DIR.parent))
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-key-for-development')
@@ -36,6 +48,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'users.middleware.MetricsMiddleware',
+    'users.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'user_service.urls'
@@ -59,9 +73,11 @@ TEMPLATES = [
 WSGI_APPLICATION = 'user_service.wsgi.application'
 
 # Database
+# Kết nối được lấy từ pool dùng chung trong process (user_service/mysql_pool),
+# CONN_MAX_AGE = 0 để cuối mỗi request connection được trả lại pool
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'user_service.mysql_pool',
         'NAME': os.environ.get('DB_NAME', 'ecommerce_user'),
         'USER': os.environ.get('DB_USER', 'root'),
         'PASSWORD': os.environ.get('DB_PASSWORD', 'root'),
@@ -70,10 +86,32 @@ DATABASES = {
         'OPTIONS': {
             'charset': 'utf8mb4',
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'"
-        }
+        },
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'SIZE': int(os.environ.get('DB_POOL_SIZE', 20)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            'PING_INTERVAL': int(os.environ.get('DB_POOL_PING_INTERVAL', 30)),
+        },
     }
 }
 
+# Cache user trong process, dùng khi cần object User đầy đủ
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'users': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'users',
+        'TIMEOUT': int(os.environ.get('USER_CACHE_TIMEOUT', 60)),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000))},
+    },
+}
+# Từ chối token của user đã bị khoá (kiểm tra qua cache, không query mỗi request)
+USERS_AUTH_CHECK_ACTIVE = os.environ.get('USERS_AUTH_CHECK_ACTIVE', 'True') == 'True'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -90,6 +128,47 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Read replica: DB_REPLICA_HOSTS="host1,host2:3306", mỗi host thành một alias replicaN
+for _index, _host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    _host, _, _port = _host.strip().partition(':')
+    DATABASES[f'replica{_index}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['users.routers.ReplicaRouter']
+# Sau khi ghi, các lần đọc của user đó đi vào primary trong khoảng thời gian này (giây)
+READ_YOUR_WRITES_WINDOW = int(os.environ.get('READ_YOUR_WRITES_WINDOW', 5))
+
+# Password hashing: hasher đầu tiên dùng để hash mới, các hasher còn lại chỉ để
+# kiểm tra mật khẩu cũ (sẽ được hash lại bằng hasher mới khi đăng nhập)
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'argon2')
+_PASSWORD_HASHERS = {
+    'argon2': 'users.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'users.hashers.TunedBCryptSHA256PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 19456))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 11))
+
+# Hash/kiểm tra mật khẩu chạy trên process pool riêng (0 = chạy ngay trong request)
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASHING_MAX_PENDING = int(os.environ.get('PASSWORD_HASHING_MAX_PENDING', 64))
+PASSWORD_HASHING_TIMEOUT = float(os.environ.get('PASSWORD_HASHING_TIMEOUT', 5))
+
+AUTHENTICATION_BACKENDS = [
+    'users.backends.PooledModelBackend',
+]
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -106,12 +185,39 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'users.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'users.pagination.UserCursorPagination',
+    'PAGE_SIZE': int(os.environ.get('USERS_PAGE_SIZE', 50)),
 }
+USERS_MAX_PAGE_SIZE = int(os.environ.get('USERS_MAX_PAGE_SIZE', 500))
+# list/retrieve/search đọc bằng values() và dựng JSON trực tiếp, không qua ModelSerializer
+USERS_FAST_SERIALIZATION = os.environ.get('USERS_FAST_SERIALIZATION', 'True') == 'True'
+# Số user đọc mỗi lần khi stream /api/users/export/
+USERS_EXPORT_CHUNK_SIZE = int(os.environ.get('USERS_EXPORT_CHUNK_SIZE', 2000))
+# Số user tối đa mỗi token được xếp hạng khi tìm kiếm; prefix quá phổ biến chỉ lấy phần khớp sát nhất
+USERS_SEARCH_MAX_CANDIDATES = int(os.environ.get('USERS_SEARCH_MAX_CANDIDATES', 1000))
+
+# Vượt query_budget của view sẽ raise thay vì chỉ ghi log (bật trong test)
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False') == 'True'
+
+# Profile CPU theo mẫu cho UserViewSet (users/profiling.py): tỉ lệ lấy mẫu, hoặc header X-Profile
+# mang đúng PROFILING_TOKEN (để trống là tắt); giữ PROFILING_KEEP profile mới nhất trong PROFILING_DIR
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILING_KEEP = int(os.environ.get('PROFILING_KEEP', 50))
+
+# Link phân trang (next/previous) trỏ về host của API gateway
+USE_X_FORWARDED_HOST = True
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
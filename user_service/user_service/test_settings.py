@@ -0,0 +1,18 @@
+from .settings import *  # noqa: F401,F403
+
+# Chạy test không cần MySQL: python manage.py test --settings=user_service.test_settings
+# 'replica1' là mirror của 'default' (cùng database test nhưng connection riêng), nên test
+# kiểm tra được query thực sự đi qua alias nào. Mặc định không route sang replica; test nào
+# cần thì override_settings(REPLICA_DATABASES=['replica1']).
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'replica1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+REPLICA_DATABASES = []
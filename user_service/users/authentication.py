@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from .cache import get_cached_user
+
+class ClaimsUser(TokenUser):
+    """
+    Stateless user built from the `user_type` and `email` token claims.
+    The full User model is available through `.user` for the few endpoints
+    that need it.
+    """
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def user_type(self):
+        return self.token['user_type']
+
+    @cached_property
+    def user(self):
+        return get_cached_user(self.id)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Authenticates from token claims without loading the user row. Tokens
+    issued before the claims existed fall back to the cached User. With
+    USERS_AUTH_CHECK_ACTIVE, deactivated users are rejected via the cache,
+    and so are tokens whose role or email claims no longer match the user.
+    """
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        if 'user_type' not in validated_token:
+            user = get_cached_user(validated_token[api_settings.USER_ID_CLAIM])
+            if user is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            if not user.is_active:
+                raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+            return user
+
+        user = ClaimsUser(validated_token)
+        if settings.USERS_AUTH_CHECK_ACTIVE:
+            if not (user.user and user.user.is_active):
+                raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+            # Đổi vai trò/email có hiệu lực ngay khi cache của user bị xoá, không đợi token hết hạn
+            stale_email = 'email' in validated_token and user.email != user.user.email
+            if user.user_type != user.user.user_type or stale_email:
+                raise AuthenticationFailed(_('Token claims are outdated'), code='claims_outdated')
+        return user
\ No newline at end of file
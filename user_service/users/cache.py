@@ -0,0 +1,28 @@
+from django.core.cache import caches
+from .models import User
+
+# Cache trong từng process, giới hạn số entry và TTL (xem CACHES['users'])
+user_cache = caches['users']
+
+
+def user_cache_key(user_id):
+    return f'user:{user_id}'
+
+
+def get_cached_user(user_id):
+    """
+    Returns the User with this id from the per-process cache, loading it on
+    a miss. Entries are dropped when the user is saved or deleted in this
+    process; other processes see the change after the cache TIMEOUT.
+    """
+    key = user_cache_key(user_id)
+    user = user_cache.get(key)
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            user_cache.set(key, user)
+    return user
+
+
+def invalidate_user(user_id):
+    user_cache.delete(user_cache_key(user_id))
\ No newline at end of file
@@ -0,0 +1,50 @@
+import hashlib
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def version_of(instance, with_profile):
+    """
+    Returns (user updated_at, profile updated_at or None) from a model
+    instance or a values() row.
+    """
+    if isinstance(instance, dict):
+        return instance['updated_at'], instance.get('profile__updated_at') if with_profile else None
+    profile = getattr(instance, 'profile', None) if with_profile else None
+    return instance.updated_at, profile and profile.updated_at
+
+
+def instance_id(instance):
+    return instance['id'] if isinstance(instance, dict) else instance.pk
+
+
+class ConditionalRetrieveMixin:
+    """
+    Viewset mixin: `retrieve` sends a strong ETag and Last-Modified built
+    from the user and profile versions, and answers If-None-Match /
+    If-Modified-Since with 304 before anything is serialized.
+    """
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        fields = self.requested_fields()
+        with_profile = fields is None or 'profile' in fields
+        user_updated, profile_updated = version_of(instance, with_profile)
+        last_modified = max(filter(None, (user_updated, profile_updated)))
+        # Cùng version nhưng khác ?fields= hay định dạng thì body khác nhau
+        variant = f'{request.accepted_media_type}|{request.META.get("QUERY_STRING", "")}'
+        digest = hashlib.md5(
+            f'{user_updated.isoformat()}|{profile_updated and profile_updated.isoformat()}|{variant}'.encode()
+        ).hexdigest()
+        etag = f'"{instance_id(instance)}-{digest}"'
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified.timestamp()),
+        )
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Người gọi khác nhau có quyền khác nhau: chỉ cache riêng và phải kiểm tra lại
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+
+USER_COLUMNS = ('id', 'email', 'username', 'first_name', 'last_name', 'user_type', 'is_active', 'date_joined')
+PROFILE_COLUMNS = ('phone', 'address', 'city', 'country', 'postal_code')
+# profile__id đứng cuối, chỉ để biết user có profile hay không (không xuất ra file)
+COLUMNS = USER_COLUMNS + tuple(f'profile__{name}' for name in PROFILE_COLUMNS) + ('profile__id',)
+
+
+def iter_chunks(queryset, chunk_size):
+    """
+    Yields the rows of `queryset` as lists of tuples, `chunk_size` at a time,
+    walking the primary key (keyset) instead of holding a cursor open: the
+    MySQL drivers buffer a whole result set client-side even with iterator().
+    """
+    last_id = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id).order_by('id').values_list(*COLUMNS)[:chunk_size]
+        )
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def ndjson_lines(chunks):
+    user_count = len(USER_COLUMNS)
+    for rows in chunks:
+        yield ''.join(
+            json.dumps(
+                {
+                    **dict(zip(USER_COLUMNS, row)),
+                    # Giống API đọc: user chưa có profile thì "profile": null
+                    'profile': None if row[-1] is None else dict(zip(PROFILE_COLUMNS, row[user_count:-1])),
+                },
+                cls=DjangoJSONEncoder, ensure_ascii=False,
+            ) + '\n'
+            for row in rows
+        ).encode()
+
+
+def csv_lines(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(USER_COLUMNS + PROFILE_COLUMNS)
+    # Gửi header ngay, kể cả khi không có dòng nào
+    yield buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    for rows in chunks:
+        writer.writerows(row[:-1] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+    'csv': ('text/csv; charset=utf-8', csv_lines),
+}
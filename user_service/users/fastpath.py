@@ -0,0 +1,75 @@
+from django.conf import settings
+from .serializers import UserProfileSerializer
+
+PROFILE_FIELDS = UserProfileSerializer.Meta.fields
+
+
+class ValuesSerializer:
+    """
+    Read-only stand-in for a user ModelSerializer that builds the same
+    output from `values()` rows: no serializer or model instance per row.
+    Only valid for serializers whose fields are plain model columns plus
+    the nested `profile`, like UserSerializer and CustomerSerializer.
+    """
+    def __init__(self, serializer_class, fields=None):
+        declared = serializer_class.Meta.fields
+        self.user_fields = tuple(
+            name for name in declared
+            if name != 'profile' and (fields is None or name in fields)
+        )
+        self.with_profile = 'profile' in declared and (fields is None or 'profile' in fields)
+
+    def columns(self):
+        # id/user_type cho phân trang và kiểm tra quyền, updated_at cho ETag
+        columns = {'id', 'user_type', 'updated_at', *self.user_fields}
+        if self.with_profile:
+            columns.update(('profile__id', 'profile__updated_at'))
+            columns.update(f'profile__{name}' for name in PROFILE_FIELDS)
+        return columns
+
+    def to_representation(self, row):
+        data = {name: row[name] for name in self.user_fields}
+        if self.with_profile:
+            data['profile'] = None if row['profile__id'] is None else {
+                name: row[f'profile__{name}'] for name in PROFILE_FIELDS
+            }
+        return data
+
+
+class ValuesSerializerResult:
+    # Giao diện tối thiểu mà ListModelMixin/RetrieveModelMixin cần: `.data`
+    def __init__(self, serializer, instance, many):
+        self.serializer = serializer
+        self.instance = instance
+        self.many = many
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.serializer.to_representation(row) for row in self.instance]
+        return self.serializer.to_representation(self.instance)
+
+
+class FastReadMixin:
+    """
+    Viewset mixin serving `fast_actions` from values() rows through
+    ValuesSerializer when USERS_FAST_SERIALIZATION is on. Must come before
+    SparseFieldsetMixin, whose `?fields=` selection it honours.
+    """
+    fast_actions = ('list', 'retrieve', 'search')
+
+    def use_fast_path(self):
+        return settings.USERS_FAST_SERIALIZATION and self.action in self.fast_actions
+
+    def values_serializer(self):
+        return ValuesSerializer(self.get_serializer_class(), self.requested_fields())
+
+    def with_fieldset(self, queryset):
+        if self.use_fast_path():
+            return queryset.values(*self.values_serializer().columns())
+        return super().with_fieldset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.use_fast_path() and args:
+            return ValuesSerializerResult(self.values_serializer(), args[0], kwargs.get('many', False))
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,59 @@
+from rest_framework.exceptions import ValidationError
+from .models import UserProfile
+
+PROFILE_COLUMNS = tuple(
+    f'profile__{field.name}' for field in UserProfile._meta.concrete_fields if field.name != 'user'
+)
+# Luôn đọc: id cho cursor phân trang, user_type cho kiểm tra quyền trên object,
+# updated_at cho ETag
+REQUIRED_COLUMNS = ('id', 'user_type', 'updated_at')
+
+
+class SparseFieldsetMixin:
+    """
+    Viewset mixin for `?fields=id,email&expand=profile`: read actions only
+    serialize the requested fields, and with_fieldset() only selects their
+    columns and joins user_profiles only when the profile is wanted.
+    Without `fields` the full representation is returned, as before.
+    """
+    sparse_actions = ('list', 'retrieve', 'search')
+
+    def requested_fields(self):
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = self._parse_fields()
+        return self._requested_fields
+
+    def _parse_fields(self):
+        if self.action not in self.sparse_actions:
+            return None
+        params = self.request.query_params
+        if 'fields' not in params:
+            return None
+        allowed = self.get_serializer_class().Meta.fields
+        fields = {name.strip() for name in params['fields'].split(',') if name.strip()}
+        expand = {name.strip() for name in params.get('expand', '').split(',') if name.strip()}
+        unknown = (fields - set(allowed)) | (expand - {'profile'})
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        if not fields and not expand:
+            raise ValidationError({'fields': 'Select at least one field, or omit the parameter'})
+        return frozenset(fields | expand)
+
+    def with_fieldset(self, queryset):
+        fields = self.requested_fields()
+        if fields is None:
+            return queryset.select_related('profile')
+        columns = {
+            field.name for field in queryset.model._meta.concrete_fields
+            if field.name in fields
+        }
+        columns.update(REQUIRED_COLUMNS)
+        if 'profile' in fields:
+            return queryset.select_related('profile').only(*columns, *PROFILE_COLUMNS)
+        return queryset.only(*columns)
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.requested_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,84 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Server is busy, please retry later.'
+    default_code = 'hashing_busy'
+
+
+def _init_worker(settings_module):
+    # Process con cần Django đã setup để dùng đúng PASSWORD_HASHERS
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _verify(password, encoded):
+    """
+    Runs in a worker: returns (is_correct, must_update). The rehash decision
+    is made here so the parent never has to touch the hasher itself.
+    """
+    if not check_password(password, encoded):
+        return False, False
+    preferred = get_hasher('default')
+    hasher = identify_hasher(encoded)
+    must_update = hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+    return True, must_update
+
+
+class HashingPool:
+    """
+    Bounded process pool for password hashing, so the hash CPU cost neither
+    holds the GIL of the request worker nor grows without limit under load.
+    At most `max_pending` hashes are queued; callers waiting longer than
+    `timeout` seconds for a slot get HashingBusy (503).
+    """
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'user_service.settings'),),
+                )
+            return self._executor
+
+    def run(self, fn, *args):
+        # workers = 0: chạy ngay trong request (dùng khi test/debug)
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusy()
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+
+pool = HashingPool(
+    workers=settings.PASSWORD_HASHING_WORKERS,
+    max_pending=settings.PASSWORD_HASHING_MAX_PENDING,
+    timeout=settings.PASSWORD_HASHING_TIMEOUT,
+)
+
+
+def hash_password(password):
+    return pool.run(make_password, password)
+
+
+def verify_password(password, encoded):
+    return pool.run(_verify, password, encoded)
\ No newline at end of file
@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from users.hashing import pool, verify_password
+from users.models import User
+
+BENCH_EMAIL = 'benchmark-login@example.com'
+BENCH_PASSWORD = 'benchmark-pass-123'
+
+class Command(BaseCommand):
+    """Django command to measure login throughput with and without the hashing pool"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(
+            email=BENCH_EMAIL, defaults={'username': 'benchmark-login'}
+        )
+        user.password = make_password(BENCH_PASSWORD)
+        user.save(update_fields=['password'])
+        legacy_hash = make_password(BENCH_PASSWORD, hasher='pbkdf2_sha256')
+
+        workers = pool.workers
+        try:
+            for mode, pool_workers in (('inline', 0), ('pool', workers)):
+                pool.workers = pool_workers
+                # verify_password trả về (khớp, cần hash lại); tuple luôn truthy nên chỉ lấy phần tử đầu
+                self.report(f'verify pbkdf2_sha256 ({mode})', options,
+                            lambda: verify_password(BENCH_PASSWORD, legacy_hash)[0])
+                self.report(f'login preferred hasher ({mode})', options,
+                            lambda: authenticate(email=BENCH_EMAIL, password=BENCH_PASSWORD))
+        finally:
+            pool.workers = workers
+            user.delete()
+
+    def report(self, label, options, fn):
+        fn()  # warm up (khởi tạo process pool, kết nối DB)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            for result in executor.map(lambda _: fn(), range(options['requests'])):
+                if not result:
+                    raise RuntimeError(f'{label}: authentication failed')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:40} {options['requests'] / elapsed:8.1f} logins/s "
+            f"({elapsed / options['requests'] * 1000:.1f} ms/login)"
+        )
\ No newline at end of file
@@ -0,0 +1,118 @@
+import itertools
+import timeit
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from rest_framework import permissions
+from rest_framework.exceptions import PermissionDenied
+from users.permissions import user_permission
+from users.policy import ALL_ROLES
+
+
+# Cách làm cũ của UserViewSet (trước policy table), giữ lại chỉ để so sánh:
+# permission class tạo mới mỗi request, rồi if-chain trong update/destroy
+class LegacyIsAdminOrManagerOrStaff(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return (
+            request.user and request.user.is_authenticated and
+            request.user.user_type in ['ADMIN', 'MANAGER', 'STAFF']
+        )
+
+
+class LegacyIsOwnerOrAdminOrStaff(permissions.BasePermission):
+    def has_object_permission(self, request, view, obj):
+        if request.method in permissions.SAFE_METHODS:
+            if request.user.user_type in ['ADMIN', 'MANAGER', 'STAFF']:
+                return True
+            return obj.id == request.user.id
+        if request.user.user_type == 'ADMIN':
+            return obj.user_type in ['ADMIN', 'MANAGER', 'STAFF']
+        elif request.user.user_type == 'MANAGER':
+            return obj.user_type in ['STAFF', 'CUSTOMER']
+        elif request.user.user_type == 'STAFF':
+            return obj.user_type == 'CUSTOMER'
+        elif request.user.user_type == 'CUSTOMER':
+            return obj.id == request.user.id
+        return False
+
+
+def legacy_get_permissions(view):
+    if view.action in ['list', 'retrieve']:
+        permission_classes = [LegacyIsAdminOrManagerOrStaff]
+    elif view.action in ['update', 'partial_update', 'destroy']:
+        permission_classes = [LegacyIsOwnerOrAdminOrStaff]
+    else:
+        permission_classes = [permissions.IsAuthenticated]
+    return [permission() for permission in permission_classes]
+
+
+def legacy_view_check(request, view, instance):
+    user_type = request.user.user_type
+    verb = 'chỉnh sửa thông tin' if view.action == 'update' else 'xóa thông tin'
+    if user_type == 'ADMIN' and instance.user_type not in ['ADMIN', 'MANAGER', 'STAFF']:
+        raise PermissionDenied(f"Admin chỉ có thể {verb} ADMIN, MANAGER, STAFF")
+    if user_type == 'MANAGER' and instance.user_type not in ['STAFF', 'CUSTOMER']:
+        raise PermissionDenied(f"Manager chỉ có thể {verb} STAFF, CUSTOMER")
+    if user_type == 'STAFF' and instance.user_type != 'CUSTOMER':
+        raise PermissionDenied(f"Staff chỉ có thể {verb} CUSTOMER")
+    if user_type == 'CUSTOMER' and view.action == 'update' and instance.id != request.user.id:
+        raise PermissionDenied("Customer chỉ có thể chỉnh sửa thông tin của chính mình")
+    if user_type == 'CUSTOMER' and view.action == 'destroy':
+        raise PermissionDenied("Customer không có quyền xóa tài khoản")
+
+
+class Command(BaseCommand):
+    """Django command to compare one RBAC decision per request: policy table vs the old if-chains"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        number = options['number']
+        allowed, denied = [], []
+        for actor, target, action in itertools.product(
+            sorted(ALL_ROLES), sorted(ALL_ROLES), ['retrieve', 'update', 'destroy']
+        ):
+            user = SimpleNamespace(id=1, user_type=actor, is_authenticated=True)
+            case = (
+                SimpleNamespace(user=user, data={}, method='GET' if action == 'retrieve' else 'PUT'),
+                SimpleNamespace(action=action),
+                SimpleNamespace(id=2, pk=2, user_type=target),
+            )
+            (allowed if self.decide([case]) else denied).append(case)
+
+        for label, cases, fn in (
+            ('policy decision (allowed)', allowed, lambda: self.decide(allowed)),
+            ('policy decision (denied)', denied, lambda: self.decide(denied)),
+            ('old if-chain (allowed)', allowed, lambda: self.legacy_decide(allowed)),
+            ('old if-chain (denied)', denied, lambda: self.legacy_decide(denied)),
+        ):
+            rounds = max(number // len(cases), 1)
+            elapsed = timeit.timeit(fn, number=rounds)
+            self.stdout.write(f'{label:28} {elapsed / (rounds * len(cases)) * 1e9:8.0f} ns/request')
+
+    def decide(self, cases):
+        result = True
+        for request, view, obj in cases:
+            try:
+                result = (
+                    user_permission.has_permission(request, view)
+                    and user_permission.has_object_permission(request, view, obj)
+                )
+            except PermissionDenied:
+                result = False
+        return result
+
+    def legacy_decide(self, cases):
+        result = True
+        for request, view, obj in cases:
+            try:
+                checks = legacy_get_permissions(view)
+                result = (
+                    all(check.has_permission(request, view) for check in checks)
+                    and all(check.has_object_permission(request, view, obj) for check in checks)
+                )
+                if result and view.action in ('update', 'destroy'):
+                    legacy_view_check(request, view, obj)
+            except PermissionDenied:
+                result = False
+        return result
@@ -0,0 +1,76 @@
+import time
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from users.management.commands.benchmark_user_queries import BENCH_DOMAIN, Command as SeedCommand
+from users.models import User, UserProfile, UserSearchTerm
+from users.policy import USER_POLICY, STAFF
+from users.search import search_users
+
+# Tra cứu thông thường của nhân viên hỗ trợ; 'last1' là trường hợp xấu (khớp ~11% số user),
+# 'first12 last12' có mỗi token khớp nhiều hơn USERS_SEARCH_MAX_CANDIDATES
+QUERIES = [
+    'first4242', 'first1234 last1234', f'user123456@{BENCH_DOMAIN}', 'last99', 'last1', 'first12 last12',
+]
+
+
+class StaffActor:
+    id = 0
+    user_type = STAFF
+
+
+class Command(BaseCommand):
+    """Django command to compare indexed user search with a LIKE '%q%' scan"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000, help='Number of users to seed')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse previously seeded rows')
+
+    def handle(self, *args, **options):
+        if not options['skip_seed']:
+            SeedCommand(stdout=self.stdout).seed(options['users'], options['batch_size'])
+            # bulk_create khi seed không gửi signal nên cần index phần user chưa có term
+            first = (
+                User.objects.filter(email__endswith=f'@{BENCH_DOMAIN}', search_terms__isnull=True)
+                .order_by('id').values_list('id', flat=True).first()
+            )
+            if first is not None:
+                call_command('rebuild_search_index', after_id=first - 1, stdout=self.stdout)
+
+        # Thống kê mới để optimizer biết index term chọn lọc hơn index user_type
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                tables = ', '.join(model._meta.db_table for model in (User, UserProfile, UserSearchTerm))
+                cursor.execute(f'ANALYZE TABLE {tables}')
+            else:
+                cursor.execute('ANALYZE')
+
+        users = USER_POLICY.filter_queryset(User.objects.select_related('profile'), StaffActor())
+        for q in QUERIES:
+            # search_users đọc trước danh sách ứng viên nên phải gọi lại trong mỗi lần đo
+            self.measure(f'indexed: {q}', lambda: search_users(users, q).order_by('-score', 'id')[:50], options['runs'])
+            like = Q()
+            for token in q.split():
+                like &= (
+                    Q(email__icontains=token) | Q(first_name__icontains=token)
+                    | Q(last_name__icontains=token) | Q(profile__phone__icontains=token)
+                )
+            self.measure(f'LIKE scan: {q}', lambda: users.filter(like).order_by('id')[:50], options['runs'])
+
+    def measure(self, label, build, runs):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'-- {label}'))
+        self.stdout.write(build().explain())
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            rows = len(list(build()))
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'   {rows} rows, p50 {timings[len(timings) // 2]:.2f} ms, '
+            f'p95 {timings[min(int(len(timings) * 0.95), len(timings) - 1)]:.2f} ms, '
+            f'max {timings[-1]:.2f} ms'
+        )
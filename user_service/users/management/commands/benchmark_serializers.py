@@ -0,0 +1,48 @@
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from users.fastpath import ValuesSerializer, ValuesSerializerResult
+from users.models import User
+from users.renderers import FastJSONRenderer
+from users.serializers import UserSerializer
+
+
+class Command(BaseCommand):
+    """Django command to compare per-row cost of the ModelSerializer and values() read paths"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Rows per page, like ?page_size=')
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows, runs = options['rows'], options['runs']
+        users = User.objects.order_by('id')[:rows]
+        values = ValuesSerializer(UserSerializer)
+        count = users.count()
+        if not count:
+            self.stdout.write(self.style.WARNING('No users, seed some first (benchmark_user_queries)'))
+            return
+
+        def model_path():
+            return UserSerializer(list(users.select_related('profile')), many=True).data
+
+        def values_path():
+            return ValuesSerializerResult(values, list(users.values(*values.columns())), many=True).data
+
+        data = model_path()
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{count} rows per page, {runs} runs'))
+        self.report('query + ModelSerializer', model_path, count, runs)
+        self.report('query + ValuesSerializer', values_path, count, runs)
+        self.report('JSONRenderer', lambda: JSONRenderer().render(data), count, runs)
+        self.report('FastJSONRenderer', lambda: FastJSONRenderer().render(data), count, runs)
+
+    def report(self, label, fn, count, runs):
+        fn()  # warm up
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        p50 = timings[len(timings) // 2]
+        self.stdout.write(f'{label:<28} p50 {p50 * 1000:8.2f} ms/page {p50 / count * 1e6:8.2f} us/row')
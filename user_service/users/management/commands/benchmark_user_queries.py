@@ -0,0 +1,104 @@
+import time
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from users.models import User, UserProfile
+
+BENCH_DOMAIN = 'bench.invalid'
+USER_TYPES = ['CUSTOMER'] * 17 + ['STAFF', 'MANAGER', 'ADMIN']
+
+class Command(BaseCommand):
+    """Django command to seed a large user table and measure role-filtered queries"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000, help='Number of users to seed')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse previously seeded rows')
+        parser.add_argument('--compare', action='store_true',
+                            help='Also measure with the user_type indexes dropped')
+        parser.add_argument('--cleanup', action='store_true', help='Delete seeded rows and exit')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} rows'))
+            return
+        if not options['skip_seed']:
+            self.seed(options['users'], options['batch_size'])
+
+        if options['compare']:
+            self.stdout.write(self.style.MIGRATE_HEADING('Without user_type indexes'))
+            indexes = User._meta.indexes
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(User, index)
+            try:
+                self.measure(options['runs'])
+            finally:
+                with connection.schema_editor() as editor:
+                    for index in indexes:
+                        editor.add_index(User, index)
+        self.stdout.write(self.style.MIGRATE_HEADING('With user_type indexes'))
+        self.measure(options['runs'])
+
+    def seed(self, total, batch_size):
+        # Cùng một hash cho mọi user để không tốn thời gian hash khi seed
+        password = make_password('benchmark-pass-123')
+        start = User.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').count()
+        started = time.perf_counter()
+        for offset in range(start, total, batch_size):
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(
+                        email=f'user{n}@{BENCH_DOMAIN}', username=f'bench{n}', password=password,
+                        first_name=f'First{n}', last_name=f'Last{n}',
+                        user_type=USER_TYPES[n % len(USER_TYPES)], is_active=n % 50 != 0,
+                    )
+                    for n in range(offset, min(offset + batch_size, total))
+                ], batch_size=batch_size)
+            self.stdout.write(f'Seeded {min(offset + batch_size, total)}/{total} users', ending='\r')
+        # Tạo profile bằng một câu INSERT ... SELECT thay vì đọc lại id từng batch
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {UserProfile._meta.db_table} (user_id, city, country, created_at, updated_at) "
+                f"SELECT u.id, 'Hanoi', 'Vietnam', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP "
+                f"FROM {User._meta.db_table} u LEFT JOIN {UserProfile._meta.db_table} p ON p.user_id = u.id "
+                f"WHERE u.email LIKE %s AND p.id IS NULL",
+                [f'%@{BENCH_DOMAIN}'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'\nSeeded {total - start} users in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def queries(self):
+        users = User.objects.select_related('profile')
+        middle = User.objects.filter(user_type='CUSTOMER').order_by('id').values_list('id', flat=True)
+        middle_id = middle[middle.count() // 2] if middle.exists() else 0
+        return [
+            ('staff: customers, first page',
+             users.filter(user_type='CUSTOMER').order_by('id')[:50]),
+            ('staff: customers, deep keyset page',
+             users.filter(user_type='CUSTOMER', id__gt=middle_id).order_by('id')[:50]),
+            ('admin: active staff',
+             users.filter(is_active=True, user_type='STAFF').order_by('id')[:50]),
+            ('admin: inactive users per type',
+             User.objects.filter(is_active=False).values('user_type').annotate(total=Count('id')).order_by()),
+        ]
+
+    def measure(self, runs):
+        for label, queryset in self.queries():
+            self.stdout.write(f'-- {label}')
+            self.stdout.write(queryset.explain())
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'   p50 {timings[len(timings) // 2]:.2f} ms, '
+                f'p95 {timings[min(int(len(timings) * 0.95), len(timings) - 1)]:.2f} ms, '
+                f'max {timings[-1]:.2f} ms'
+            )
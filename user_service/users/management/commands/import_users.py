@@ -0,0 +1,234 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+from users.hashing import _init_worker
+from users.models import User, UserProfile, UserSearchTerm
+from users.search import build_terms, phone_terms, user_terms
+
+USER_TYPES = {choice for choice, _ in User.USER_TYPE_CHOICES}
+PROFILE_FIELDS = ['phone', 'address', 'city', 'country', 'postal_code']
+MAX_LENGTHS = {
+    **{name: User._meta.get_field(name).max_length for name in ('email', 'username', 'first_name', 'last_name')},
+    **{name: UserProfile._meta.get_field(name).max_length for name in PROFILE_FIELDS},
+}
+
+
+def read_rows(path, fmt):
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Dòng hỏng được báo và bỏ qua (row_error), không dừng cả lần import
+                        yield None
+
+
+def row_error(row):
+    """
+    Why `row` cannot be imported, or None. Over-long values are rejected
+    here: MySQL in strict mode would otherwise fail the whole batch.
+    """
+    if not isinstance(row, dict):
+        return 'not a JSON object'
+    email = row.get('email')
+    if not isinstance(email, str) or not email.strip():
+        return 'no email'
+    try:
+        validate_email(email.strip())
+    except ValidationError:
+        return f'invalid email {email!r}'
+    for field, max_length in MAX_LENGTHS.items():
+        value = row.get(field)
+        if max_length and value and len(str(value)) > max_length:
+            return f'{field} is longer than {max_length} characters'
+    return None
+
+
+class Command(BaseCommand):
+    """Django command to bulk import users and profiles from a CSV or JSONL file"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header) or JSONL file')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Hashing processes, 0 hashes inline')
+        parser.add_argument('--checkpoint', help='Progress file, defaults to <path>.checkpoint')
+        parser.add_argument('--resume', action='store_true',
+                            help='Skip the rows recorded in the checkpoint')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        done = self.read_checkpoint(checkpoint) if options['resume'] else 0
+        if done:
+            self.stdout.write(f'Resuming after row {done}')
+
+        rows = islice(read_rows(path, fmt), done, None)
+        executor = None
+        if options['workers']:
+            executor = ProcessPoolExecutor(
+                max_workers=options['workers'],
+                initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'user_service.settings'),),
+            )
+        started = time.perf_counter()
+        processed = imported = renamed = invalid = 0
+        try:
+            # Hash batch kế tiếp trong worker trong khi batch hiện tại đang được insert
+            pending = None
+            read = done
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                valid = self.valid_rows(batch, first_row=read + 1)
+                invalid += len(batch) - len(valid)
+                read += len(batch)
+                hashes = self.hash_passwords(valid, executor, options['workers']) if valid else []
+                if pending:
+                    batch_size, batch_rows, batch_hashes = pending
+                    batch_imported, batch_renamed = self.insert(batch_rows, batch_hashes)
+                    imported += batch_imported
+                    renamed += batch_renamed
+                    processed += batch_size
+                    self.write_checkpoint(checkpoint, done + processed)
+                    rate = processed / (time.perf_counter() - started)
+                    self.stdout.write(f'{done + processed} rows, {imported} imported, {rate:.0f} rows/s',
+                                      ending='\r')
+                if not batch:
+                    break
+                pending = (len(batch), valid, hashes)
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'\nImported {imported} of {processed} rows in {elapsed:.1f}s '
+            f'({processed / elapsed if elapsed else 0:.0f} rows/s), '
+            f'{processed - imported - invalid} skipped as duplicates, {invalid} skipped as invalid, '
+            f'{renamed} renamed because their username was taken'
+        ))
+
+    def valid_rows(self, batch, first_row):
+        valid = []
+        for number, row in enumerate(batch, first_row):
+            error = row_error(row)
+            if error:
+                self.stderr.write(f'Row {number}: {error}, skipped')
+            else:
+                valid.append(row)
+        return valid
+
+    def hash_passwords(self, batch, executor, workers):
+        # Không có mật khẩu: make_password(None) tạo mật khẩu không dùng được
+        passwords = [row.get('password') or None for row in batch]
+        if executor is None:
+            return map(make_password, passwords)
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return executor.map(make_password, passwords, chunksize=chunksize)
+
+    def insert(self, batch, hashes):
+        users, rows = {}, {}
+        for row, password in zip(batch, hashes):
+            email = User.objects.normalize_email(row['email'].strip())
+            # Email trùng trong cùng batch: giữ dòng đầu tiên
+            if email.lower() in users:
+                continue
+            user_type = (row.get('user_type') or 'CUSTOMER').upper()
+            users[email.lower()] = User(
+                email=email,
+                username=User.normalize_username(row.get('username') or email[:MAX_LENGTHS['username']]),
+                first_name=row.get('first_name') or '',
+                last_name=row.get('last_name') or '',
+                user_type=user_type if user_type in USER_TYPES else 'CUSTOMER',
+                password=password,
+            )
+            rows[email.lower()] = row
+
+        with transaction.atomic():
+            # Bỏ các email đã có (khi resume hoặc trùng user cũ); so sánh không phân biệt hoa thường như MySQL
+            existing = User.objects.filter(email__in=[user.email for user in users.values()])
+            for email in existing.values_list('email', flat=True):
+                users.pop(email.lower(), None)
+            renamed = self.dedupe_usernames(users.values())
+
+            # Không dùng ignore_conflicts: trên MySQL đó là INSERT IGNORE, cắt ngắn dữ liệu thay vì báo lỗi
+            User.objects.bulk_create(users.values())
+            # MySQL không trả về id sau bulk_create, lấy lại theo email; các email này chưa tồn tại trước batch
+            created = [
+                (users[email.lower()], user_id)
+                for email, user_id in User.objects.filter(
+                    email__in=[user.email for user in users.values()]
+                ).values_list('email', 'id')
+            ]
+            UserProfile.objects.bulk_create([
+                UserProfile(user_id=user_id, **{
+                    field: rows[user.email.lower()].get(field) or None for field in PROFILE_FIELDS
+                })
+                for user, user_id in created
+            ])
+            # bulk_create không gửi signal nên bảng tìm kiếm được ghi trực tiếp
+            UserSearchTerm.objects.bulk_create([
+                term
+                for user, user_id in created
+                for term in build_terms(
+                    user_id, user_terms(user) | phone_terms(rows[user.email.lower()].get('phone'))
+                )
+            ])
+        return len(created), renamed
+
+    def dedupe_usernames(self, users):
+        """
+        Gives a `-N` suffix to usernames already taken by another user (or an
+        earlier row of the batch), since the insert would otherwise fail on
+        the unique username. Returns how many changed.
+        """
+        users = list(users)
+        taken = {
+            username.lower()
+            for username in User.objects.filter(
+                username__in=[user.username for user in users]
+            ).values_list('username', flat=True)
+        }
+        renamed = 0
+        for user in users:
+            if user.username.lower() in taken:
+                base, n = user.username[:140], 2
+                while (
+                    f'{base}-{n}'.lower() in taken
+                    or User.objects.filter(username__iexact=f'{base}-{n}').exists()
+                ):
+                    n += 1
+                user.username = f'{base}-{n}'
+                renamed += 1
+            taken.add(user.username.lower())
+        return renamed
+
+    def read_checkpoint(self, checkpoint):
+        try:
+            with open(checkpoint) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            raise CommandError(f'Invalid checkpoint file {checkpoint}')
+
+    def write_checkpoint(self, checkpoint, rows):
+        tmp = f'{checkpoint}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(rows))
+        os.replace(tmp, checkpoint)
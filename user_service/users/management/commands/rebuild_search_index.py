@@ -0,0 +1,39 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from users.models import User, UserSearchTerm
+from users.search import build_terms, phone_terms, user_terms
+
+class Command(BaseCommand):
+    """Django command to (re)build the user search table for existing users"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--after-id', type=int, default=0, help='Resume after this user id')
+
+    def handle(self, *args, **options):
+        last_id = options['after_id']
+        indexed = 0
+        started = time.perf_counter()
+        while True:
+            users = list(
+                User.objects.filter(id__gt=last_id).order_by('id')
+                .select_related('profile')
+                .only('id', 'email', 'first_name', 'last_name', 'username', 'profile__phone')
+                [:options['batch_size']]
+            )
+            if not users:
+                break
+            terms = []
+            for user in users:
+                profile = getattr(user, 'profile', None)
+                terms += build_terms(user.id, user_terms(user) | phone_terms(profile and profile.phone))
+            with transaction.atomic():
+                UserSearchTerm.objects.filter(user_id__in=[user.id for user in users]).delete()
+                UserSearchTerm.objects.bulk_create(terms)
+            last_id = users[-1].id
+            indexed += len(users)
+            self.stdout.write(f'Indexed {indexed} users (last id {last_id})', ending='\r')
+        self.stdout.write(self.style.SUCCESS(
+            f'\nIndexed {indexed} users in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,57 @@
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from user_service.mysql_pool.base import pool_stats
+
+# Registry riêng: /metrics chỉ xuất các metric của user_service
+registry = CollectorRegistry()
+
+# Bucket (giây) cho độ trễ request và tổng thời gian query của một request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+requests_total = Counter(
+    'user_service_requests_total', 'Requests handled, per view.', ['view', 'method', 'status'],
+    registry=registry,
+)
+request_errors_total = Counter(
+    'user_service_request_errors_total', 'Requests answered with a 5xx status.', ['view', 'method'],
+    registry=registry,
+)
+request_duration = Histogram(
+    'user_service_request_duration_seconds', 'Time spent in Django until the response is returned.',
+    ['view', 'method'], buckets=LATENCY_BUCKETS, registry=registry,
+)
+db_queries = Histogram(
+    'user_service_db_queries', 'SQL queries issued per request.', ['view', 'method'],
+    buckets=QUERY_COUNT_BUCKETS, registry=registry,
+)
+db_duration = Histogram(
+    'user_service_db_duration_seconds', 'Time spent executing SQL per request.', ['view', 'method'],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+
+POOL_GAUGES = (
+    ('in_use', GaugeMetricFamily, 'Pooled connections checked out.'),
+    ('idle', GaugeMetricFamily, 'Pooled connections waiting to be reused.'),
+    ('waits', CounterMetricFamily, 'Checkouts that had to wait for a free connection.'),
+    ('timeouts', CounterMetricFamily, 'Checkouts that gave up waiting.'),
+)
+
+
+class PoolCollector:
+    """Reads the connection pool stats of every database alias at scrape time."""
+    def collect(self):
+        stats = pool_stats()
+        for key, family, help in POOL_GAUGES:
+            metric = family(f'user_service_db_pool_{key}', help, labels=['database'])
+            for alias, values in sorted(stats.items()):
+                metric.add_metric([alias], values[key])
+            yield metric
+
+
+registry.register(PoolCollector())
+
+
+def render_metrics():
+    return generate_latest(registry)
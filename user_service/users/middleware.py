@@ -0,0 +1,112 @@
+import logging
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from .metrics import db_duration, db_queries, request_duration, request_errors_total, requests_total
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+
+
+def get_query_budget(view_func, request):
+    """
+    Returns the query budget declared by the view for this request, or None.
+    Viewsets declare `query_budget` as a dict keyed by action name, plain
+    views as an int.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        actions = getattr(view_func, 'actions', None) or {}
+        return budget.get(actions.get(request.method.lower()))
+    return budget
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the SQL queries issued while handling each request and reports
+    them in `X-Query-Count`. When the view declares a `query_budget`, going
+    over it is logged, or raised as QueryBudgetExceeded when
+    QUERY_BUDGET_STRICT is on (tests).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        request.query_counter = counter
+        request.query_budget = None
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        response['X-Query-Count'] = str(counter.count)
+        budget = request.query_budget
+        if budget is not None:
+            response['X-Query-Budget'] = str(budget)
+            if counter.count > budget:
+                message = (
+                    f"{request.method} {request.path} ran {counter.count} queries, "
+                    f"budget is {budget}"
+                )
+                if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request)
+
+
+class MetricsMiddleware:
+    """
+    Records request count, 5xx errors, latency and SQL query count/time per
+    view for /metrics, and reports the same request's numbers in a
+    Server-Timing header. Sits before QueryBudgetMiddleware, which counts
+    the queries into `request.query_counter`.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        # Dùng tên view (user-list, user-detail...) để số series không tăng theo id
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        method = request.method
+        requests_total.labels(view=view, method=method, status=response.status_code).inc()
+        if response.status_code >= 500:
+            request_errors_total.labels(view=view, method=method).inc()
+        request_duration.labels(view=view, method=method).observe(elapsed)
+
+        timings = []
+        counter = getattr(request, 'query_counter', None)
+        if counter is not None:
+            db_queries.labels(view=view, method=method).observe(counter.count)
+            db_duration.labels(view=view, method=method).observe(counter.duration)
+            timings.append(f'db;dur={counter.duration * 1000:.1f};desc="{counter.count} queries"')
+        timings.append(f'app;dur={elapsed * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+        return response
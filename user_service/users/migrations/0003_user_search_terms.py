@@ -0,0 +1,30 @@
+# Generated by Django 4.0 on 2026-10-18 15:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_type_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('email', 'Email'), ('name', 'Name'), ('phone', 'Phone')], max_length=5)),
+                ('term', models.CharField(max_length=100)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='users.user')),
+            ],
+            options={
+                'db_table': 'user_search_terms',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='usersearchterm',
+            index=models.Index(fields=['term', 'user'], name='search_term_user_idx'),
+        ),
+    ]
@@ -16,17 +16,33 @@ class User(AbstractUser):
     email = models.EmailField(_('email address'), unique=True)
     user_type = models.CharField(max_length=10, choices=USER_TYPE_CHOICES, default='CUSTOMER')
     is_active = models.BooleanField(default=True)
+    # Version của user, dùng cho ETag/Last-Modified (users/conditional.py)
+    updated_at = models.DateTimeField(auto_now=True)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     
     def __str__(self):
         return self.email
+
+    def save(self, *args, **kwargs):
+        # auto_now chỉ được ghi khi nằm trong update_fields; last_login không
+        # thuộc dữ liệu trả về nên không làm đổi version
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) - {'last_login'}:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
     
     class Meta:
         db_table = 'users'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Danh sách customer theo user_type, phân trang keyset theo id
+            models.Index(fields=['user_type', 'id'], name='users_type_id_idx'),
+            # Bộ lọc is_active/user_type của admin
+            models.Index(fields=['is_active', 'user_type'], name='users_active_type_idx'),
+        ]
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')    
@@ -44,4 +60,26 @@ class UserProfile(models.Model):
     class Meta:
         db_table = 'user_profiles'
         verbose_name = 'User Profile'
-        verbose_name_plural = 'User Profiles'
\ No newline at end of file
+        verbose_name_plural = 'User Profiles'
+
+
+class UserSearchTerm(models.Model):
+    """
+    Normalized search token of a user (see users/search.py). Searching is a
+    prefix range scan on (term, user), kept in sync by signals on writes.
+    """
+    FIELD_CHOICES = (
+        ('email', 'Email'),
+        ('name', 'Name'),
+        ('phone', 'Phone'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_terms')
+    field = models.CharField(max_length=5, choices=FIELD_CHOICES)
+    term = models.CharField(max_length=100)
+
+    class Meta:
+        db_table = 'user_search_terms'
+        indexes = [
+            models.Index(fields=['term', 'user'], name='search_term_user_idx'),
+        ]
@@ -0,0 +1,20 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+class UserCursorPagination(CursorPagination):
+    """
+    Keyset pagination on `id`: every page is a `WHERE id > cursor LIMIT n`
+    query, so deep pages cost the same as the first one.
+    """
+    ordering = 'id'
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = settings.USERS_MAX_PAGE_SIZE
+
+
+class UserSearchPagination(UserCursorPagination):
+    """
+    Cursor pagination over ranked search results: best score first, then id
+    to keep the order stable between pages.
+    """
+    ordering = ('-score', 'id')
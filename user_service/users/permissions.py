@@ -1,77 +1,50 @@
 from rest_framework import permissions
+from rest_framework.exceptions import PermissionDenied
+from .policy import USER_POLICY, CUSTOMER_POLICY
 
-class IsAdminUser(permissions.BasePermission):
+class PolicyPermission(permissions.BasePermission):
     """
-    Allows access only to admin users.
+    Evaluates a compiled Policy for the view's action. One shared instance
+    per viewset is enough since it keeps no per-request state.
+    Actions not covered by the policy only require authentication.
     """
-    def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.user_type == 'ADMIN'
-
-class IsManagerUser(permissions.BasePermission):
-    """
-    Allows access only to manager users.
-    """
-    def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.user_type == 'MANAGER'
-
-class IsStaffUser(permissions.BasePermission):
-    """
-    Allows access only to staff users.
-    """
-    def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.user_type == 'STAFF'
-
-class IsCustomerUser(permissions.BasePermission):
-    """
-    Allows access only to customer users.
-    """
-    def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.user_type == 'CUSTOMER'
+    def __init__(self, policy, public_actions=(), default_target=None):
+        self.policy = policy
+        self.public_actions = frozenset(public_actions)
+        self.default_target = default_target
 
-class IsAdminOrManager(permissions.BasePermission):
-    """
-    Allows access to admin or manager users.
-    """
     def has_permission(self, request, view):
-        return (
-            request.user and request.user.is_authenticated and 
-            request.user.user_type in ['ADMIN', 'MANAGER']
-        )
+        if view.action in self.public_actions:
+            return True
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        if not self.policy.governs(view.action):
+            return True
+
+        if view.action == 'create':
+            # Quyền tạo phụ thuộc loại tài khoản được tạo
+            target = self.default_target or str(request.data.get('user_type', 'CUSTOMER')).upper()
+            if not self.policy.allows(user.user_type, 'create', target):
+                raise PermissionDenied(self.policy.denial_message(user.user_type, 'create'))
+            return True
+        if not self.policy.targets(user.user_type, view.action):
+            raise PermissionDenied(self.policy.denial_message(user.user_type, view.action))
+        return True
 
-class IsAdminOrManagerOrStaff(permissions.BasePermission):
-    """
-    Allows access to admin, manager, or staff users.
-    """
-    def has_permission(self, request, view):
-        return (
-            request.user and request.user.is_authenticated and 
-            request.user.user_type in ['ADMIN', 'MANAGER', 'STAFF']
-        )
-
-class IsOwnerOrAdminOrStaff(permissions.BasePermission):
-    """
-    Object-level permission to only allow owners of an object to edit it.
-    Assumes the model instance has an `user` attribute.
-    """
     def has_object_permission(self, request, view, obj):
-        # Đọc quyền được cho phép cho bất kỳ yêu cầu nào
-        if request.method in permissions.SAFE_METHODS:
-            if request.user.user_type in ['ADMIN', 'MANAGER', 'STAFF']:
-                return True
-            return obj.id == request.user.id
-
-        # Kiểm tra quyền cho những hành động không được đảm bảo an toàn
-        if request.user.user_type == 'ADMIN':
-            # Admin có thể chỉnh sửa thông tin người dùng là admin, manager, staff
-            return obj.user_type in ['ADMIN', 'MANAGER', 'STAFF']
-        elif request.user.user_type == 'MANAGER':
-            # Manager có thể chỉnh sửa thông tin người dùng là staff, customer
-            return obj.user_type in ['STAFF', 'CUSTOMER']
-        elif request.user.user_type == 'STAFF':
-            # Staff chỉ có thể chỉnh sửa thông tin người dùng là customer
-            return obj.user_type == 'CUSTOMER'
-        elif request.user.user_type == 'CUSTOMER':
-            # Customer chỉ có thể chỉnh sửa thông tin của chính mình
-            return obj.id == request.user.id
-        
-        return False
\ No newline at end of file
+        if not self.policy.governs(view.action):
+            return True
+        user = request.user
+        # obj là model instance, hoặc dict khi view đọc bằng values() (users/fastpath.py)
+        if isinstance(obj, dict):
+            target, target_id = obj['user_type'], obj['id']
+        else:
+            target, target_id = obj.user_type, obj.pk
+        if not self.policy.allows(user.user_type, view.action, target, target_id == user.id):
+            raise PermissionDenied(self.policy.denial_message(user.user_type, view.action))
+        return True
+
+
+user_permission = PolicyPermission(USER_POLICY, public_actions=('register', 'login'))
+customer_permission = PolicyPermission(CUSTOMER_POLICY, default_target='CUSTOMER')
\ No newline at end of file
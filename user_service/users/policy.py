@@ -0,0 +1,125 @@
+from django.db.models import Q
+
+ADMIN = 'ADMIN'
+MANAGER = 'MANAGER'
+STAFF = 'STAFF'
+CUSTOMER = 'CUSTOMER'
+ALL_ROLES = frozenset([ADMIN, MANAGER, STAFF, CUSTOMER])
+# Target đặc biệt: chính tài khoản của người thực hiện
+SELF = 'SELF'
+
+ACTION_VERBS = {
+    'create': 'tạo tài khoản',
+    'update': 'chỉnh sửa thông tin',
+    'partial_update': 'chỉnh sửa thông tin',
+    'destroy': 'xóa thông tin',
+    'export': 'xuất danh sách người dùng',
+    'search': 'tìm kiếm người dùng',
+    'profiles': 'xem profile hiệu năng',
+    'profile_detail': 'xem profile hiệu năng',
+}
+# Thông báo khi role không có quyền gì với action, nếu khác ACTION_VERBS
+NO_PERMISSION_VERBS = {
+    'destroy': 'xóa tài khoản',
+}
+
+
+class Policy:
+    """
+    Declarative RBAC table: {action: {actor_role: target_roles}}, compiled
+    once into a set of (actor, action, target) triples so every decision is
+    a single set lookup. The 'view' action defines which users an actor can
+    see and doubles as the queryset filter.
+    """
+    def __init__(self, rules):
+        self.rules = rules
+        self._allowed = frozenset(
+            (actor, action, target)
+            for action, actors in rules.items()
+            for actor, targets in actors.items()
+            for target in targets
+        )
+        self._targets = {
+            (actor, action): frozenset(targets)
+            for action, actors in rules.items()
+            for actor, targets in actors.items()
+        }
+
+    def governs(self, action):
+        return action in self.rules
+
+    def targets(self, actor, action):
+        return self._targets.get((actor, action), frozenset())
+
+    def allows(self, actor, action, target, is_self=False):
+        return (
+            (actor, action, target) in self._allowed
+            or (is_self and (actor, action, SELF) in self._allowed)
+        )
+
+    def filter_queryset(self, queryset, user, action='view'):
+        targets = self.targets(user.user_type, action)
+        if ALL_ROLES <= targets:
+            return queryset
+        if not targets:
+            return queryset.none()
+        condition = Q(pk=user.id) if SELF in targets else Q(pk__in=[])
+        roles = targets - {SELF}
+        if roles:
+            condition |= Q(user_type__in=roles)
+        return queryset.filter(condition)
+
+    def denial_message(self, actor, action):
+        verb = ACTION_VERBS.get(action, 'thực hiện thao tác này')
+        targets = self.targets(actor, action)
+        if not targets:
+            return f"{actor.title()} không có quyền {NO_PERMISSION_VERBS.get(action, verb)}"
+        if targets == {SELF}:
+            return f"{actor.title()} chỉ có thể {verb} của chính mình"
+        roles = [role for role in (ADMIN, MANAGER, STAFF, CUSTOMER) if role in targets]
+        return f"{actor.title()} chỉ có thể {verb} {', '.join(roles)}"
+
+
+USER_POLICY = Policy({
+    'view': {
+        ADMIN: ALL_ROLES,
+        MANAGER: ALL_ROLES,
+        STAFF: {CUSTOMER},
+        CUSTOMER: {SELF},
+    },
+    'list': {ADMIN: ALL_ROLES, MANAGER: ALL_ROLES, STAFF: {CUSTOMER}},
+    'retrieve': {ADMIN: ALL_ROLES, MANAGER: ALL_ROLES, STAFF: {CUSTOMER}},
+    'export': {ADMIN: ALL_ROLES, MANAGER: ALL_ROLES, STAFF: {CUSTOMER}},
+    'search': {ADMIN: ALL_ROLES, MANAGER: ALL_ROLES, STAFF: {CUSTOMER}},
+    # Profile hiệu năng không gắn với user nào, chỉ admin được xem
+    'profiles': {ADMIN: ALL_ROLES},
+    'profile_detail': {ADMIN: ALL_ROLES},
+    'create': {ADMIN: {ADMIN, MANAGER, STAFF}, MANAGER: {STAFF, CUSTOMER}},
+    'update': {
+        ADMIN: {ADMIN, MANAGER, STAFF},
+        MANAGER: {STAFF, CUSTOMER},
+        STAFF: {CUSTOMER},
+        CUSTOMER: {SELF},
+    },
+    'partial_update': {
+        ADMIN: {ADMIN, MANAGER, STAFF},
+        MANAGER: {STAFF, CUSTOMER},
+        STAFF: {CUSTOMER},
+        CUSTOMER: {SELF},
+    },
+    'destroy': {
+        ADMIN: {ADMIN, MANAGER, STAFF},
+        MANAGER: {STAFF, CUSTOMER},
+        STAFF: {CUSTOMER},
+    },
+})
+
+CUSTOMER_POLICY = Policy({
+    'view': {ADMIN: {CUSTOMER}, MANAGER: {CUSTOMER}, STAFF: {CUSTOMER}, CUSTOMER: {SELF}},
+    'list': {ADMIN: {CUSTOMER}, MANAGER: {CUSTOMER}, STAFF: {CUSTOMER}},
+    'retrieve': {ADMIN: {CUSTOMER}, MANAGER: {CUSTOMER}, STAFF: {CUSTOMER}},
+    'create': {ADMIN: {CUSTOMER}, MANAGER: {CUSTOMER}, STAFF: {CUSTOMER}},
+    'update': {MANAGER: {CUSTOMER}, STAFF: {CUSTOMER}, CUSTOMER: {SELF}},
+    'partial_update': {MANAGER: {CUSTOMER}, STAFF: {CUSTOMER}, CUSTOMER: {SELF}},
+    'destroy': {ADMIN: {CUSTOMER}, MANAGER: {CUSTOMER}, STAFF: {CUSTOMER}},
+})
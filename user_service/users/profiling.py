@@ -0,0 +1,57 @@
+import cProfile
+import threading
+import time
+from django.conf import settings
+from shared.profiling import PROFILE_HEADER, SORT_KEYS, ProfileStore, wants_profile  # noqa: F401
+
+# Mỗi process chỉ profile một request tại một thời điểm, request khác chạy bình thường
+_active = threading.Lock()
+
+
+def profile_store():
+    return ProfileStore(settings.PROFILING_DIR, settings.PROFILING_KEEP)
+
+
+class ProfilingMixin:
+    """
+    Captures a cProfile of the request when it is sampled
+    (PROFILING_SAMPLE_RATE) or sends X-Profile: <PROFILING_TOKEN>, stores it
+    in the profile ring and returns its id in X-Profile-Id. Streamed bodies
+    are only profiled until the response object is returned.
+    """
+    unprofiled_actions = ('profiles', 'profile_detail')
+
+    def dispatch(self, request, *args, **kwargs):
+        # self.action chỉ được gán trong initialize_request, bên trong dispatch
+        if (
+            self.action_map.get(request.method.lower()) in self.unprofiled_actions
+            or not wants_profile(
+                request.headers.get(PROFILE_HEADER),
+                settings.PROFILING_TOKEN,
+                settings.PROFILING_SAMPLE_RATE,
+            )
+            or not _active.acquire(blocking=False)
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                response = super().dispatch(request, *args, **kwargs)
+            finally:
+                profiler.disable()
+        finally:
+            _active.release()
+        elapsed = time.perf_counter() - started
+
+        response['X-Profile-Id'] = profile_store().save(profiler, {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'action': self.action,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'created_at': time.time(),
+        })
+        return response
@@ -0,0 +1,23 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson là tuỳ chọn, thiếu thì dùng json chuẩn
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Compact UTF-8 JSON through orjson, falling back to DRF's renderer when
+    orjson is not installed or indented output was requested. Types orjson
+    does not know (Decimal, lazy translations...) go through DRF's encoder.
+    """
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=self._encoder.default)
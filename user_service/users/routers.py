@@ -0,0 +1,82 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+# True khi request hiện tại được phép đọc từ replica
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def pin_key(user_id):
+    return f'primary-pin:{user_id}'
+
+
+def pin_to_primary(user):
+    """
+    Sends this user's reads to the primary for READ_YOUR_WRITES_WINDOW
+    seconds so they never see a replica that lags behind their own write.
+    Shared across processes when the default cache is.
+    """
+    cache.set(pin_key(user.id), True, settings.READ_YOUR_WRITES_WINDOW)
+
+
+def is_pinned(user):
+    return bool(cache.get(pin_key(user.id)))
+
+
+def replica_alias():
+    if not settings.REPLICA_DATABASES:
+        return 'default'
+    return random.choice(settings.REPLICA_DATABASES)
+
+
+class ReplicaRouter:
+    """
+    Writes always go to the primary ('default'). Reads go to a random replica
+    only inside requests that ReplicaRoutingMixin marked as replica-safe.
+    """
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return replica_alias()
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaRoutingMixin:
+    """
+    Viewset mixin: `replica_actions` read from replicas unless the caller is
+    pinned to the primary after a recent write of their own. Any successful
+    unsafe request pins the caller, except `read_only_actions` that only use
+    POST to carry a body.
+    """
+    replica_actions = ('list', 'retrieve', 'verify_token', 'export', 'search')
+    read_only_actions = ('verify_token', 'login', 'register')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        use_replica = (
+            self.action in self.replica_actions
+            and request.user.is_authenticated
+            and not is_pinned(request.user)
+        )
+        self._replica_token = _use_replica.set(use_replica)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _use_replica.reset(token)
+            self._replica_token = None
+        if (
+            request.method not in SAFE_METHODS
+            and getattr(self, 'action', None) not in self.read_only_actions
+            and response.status_code < 400
+            and request.user and request.user.is_authenticated
+        ):
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,166 @@
+import operator
+import re
+import unicodedata
+from functools import reduce
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Max, Q, Value, When
+from django.db.models.lookups import Exact, IStartsWith
+from .models import UserSearchTerm
+
+MAX_TERM_LENGTH = UserSearchTerm._meta.get_field('term').max_length
+# Token ngắn hơn sẽ quét quá nhiều dòng trong index
+MIN_QUERY_TOKEN_LENGTH = 2
+MAX_QUERY_TOKENS = 5
+PHONE_QUERY = re.compile(r'^[\d\s+().-]+$')
+
+
+def normalize(text):
+    # Bỏ dấu tiếng Việt để "Nguyễn" tìm được bằng "nguyen"
+    text = unicodedata.normalize('NFKD', text.replace('đ', 'd').replace('Đ', 'D'))
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH] for token in re.findall(r'[a-z0-9]+', normalize(text or ''))]
+
+
+def national_number(phone):
+    phone = (phone or '').strip()
+    digits = re.sub(r'\D', '', phone)
+    # 0912..., 84912..., +84912... đều lưu (và tìm) thành 912...
+    if digits.startswith('0'):
+        return digits[1:]
+    if digits.startswith('84') and (phone.startswith('+') or len(digits) > 9):
+        return digits[2:]
+    return digits
+
+
+def user_terms(user):
+    email = (user.email or '').lower()
+    terms = {('email', email[:MAX_TERM_LENGTH])} if email else set()
+    terms.update(('email', token) for token in tokenize(email))
+    for value in (user.first_name, user.last_name, user.username):
+        terms.update(('name', token) for token in tokenize(value))
+    return terms
+
+
+def phone_terms(phone):
+    number = national_number(phone)
+    return {('phone', number)} if number else set()
+
+
+def build_terms(user_id, terms):
+    return [UserSearchTerm(user_id=user_id, field=field, term=term) for field, term in terms]
+
+
+def replace_terms(user_id, fields, terms, created=False):
+    if not created:
+        UserSearchTerm.objects.filter(user_id=user_id, field__in=fields).delete()
+    UserSearchTerm.objects.bulk_create(build_terms(user_id, terms))
+
+
+def index_user(user, created=False):
+    replace_terms(user.pk, ('email', 'name'), user_terms(user), created)
+
+
+def index_profile(profile, created=False):
+    replace_terms(profile.user_id, ('phone',), phone_terms(profile.phone), created)
+
+
+def query_tokens(query):
+    query = (query or '').strip()
+    if PHONE_QUERY.match(query):
+        number = national_number(query)
+        return [number] if len(number) >= MIN_QUERY_TOKEN_LENGTH else []
+    if '@' in query:
+        # Tìm theo email đầy đủ (hoặc phần đầu của email)
+        return [query.lower()[:MAX_TERM_LENGTH]]
+    tokens = [token for token in tokenize(query) if len(token) >= MIN_QUERY_TOKEN_LENGTH]
+    return list(dict.fromkeys(tokens))[:MAX_QUERY_TOKENS]
+
+
+def next_prefix(token):
+    """
+    Smallest [0-9a-z] string sorting after every string starting with
+    `token`, or None. Digits sort before letters both in binary and in
+    MySQL's accent/case-insensitive collations, so the range is valid in both.
+    """
+    for i in range(len(token) - 1, -1, -1):
+        char = token[i]
+        if char == '9':
+            return token[:i] + 'a'
+        if '0' <= char < '9' or 'a' <= char < 'z':
+            return token[:i] + chr(ord(char) + 1)
+    return None
+
+
+def prefix_match(token, lookup='term'):
+    # Cận dưới/cận trên dạng range để DB quét index (term, user) thay vì cả bảng
+    condition = Q(**{f'{lookup}__gte': token, f'{lookup}__istartswith': token})
+    # Với token có ký tự khác chữ/số (email), chặn trên theo phần chữ/số đầu tiên
+    upper = next_prefix(re.match(r'[0-9a-z]*', token).group())
+    if upper:
+        condition &= Q(**{f'{lookup}__lt': upper})
+    return condition
+
+
+def token_score(token, term):
+    """
+    Per-user score of one query token over the joined term rows: 2 when one
+    of the user's terms is the token, 1 when one only starts with it, else 0.
+    `term` is an expression (F) on the join made by the WHERE clause: lookup
+    expressions reuse that INNER join, while Q(search_terms__...) inside an
+    annotation would turn it into a LEFT OUTER join driven from users.
+    """
+    return Max(Case(
+        When(Exact(term, Value(token)), then=Value(2)),
+        When(IStartsWith(term, Value(token)), then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
+
+
+def candidate_ids(queryset, tokens):
+    """
+    Ids of at most USERS_SEARCH_MAX_CANDIDATES users matching every token,
+    read in the (term, user) index order of the longest token: exact matches
+    come first, then the shortest completions. Each token gets its own join,
+    so the cap applies after the intersection and a user matching all tokens
+    is not lost when each token alone is common. Fetched as a list since
+    MySQL rejects LIMIT inside an IN subquery.
+    """
+    # Token dài nhất thường chọn lọc nhất, dùng nó để sắp xếp và cắt danh sách
+    tokens = sorted(tokens, key=len, reverse=True)
+    # annotate ngay sau filter dùng lại join của filter đó (term của token đầu tiên)
+    matches = queryset.filter(prefix_match(tokens[0], 'search_terms__term')).annotate(
+        candidate_term=F('search_terms__term'),
+    )
+    for token in tokens[1:]:
+        matches = matches.filter(prefix_match(token, 'search_terms__term'))
+    ids = matches.order_by('candidate_term', 'pk').values_list('pk', flat=True)
+    return set(ids[:settings.USERS_SEARCH_MAX_CANDIDATES])
+
+
+def search_users(queryset, query):
+    """
+    Ranks users matching every token of `query` as a prefix of one of their
+    search terms. Candidates are capped (see candidate_ids) so a short,
+    common prefix does not rank the whole table; the score is then
+    aggregated from one join on the term index (users missing a token are
+    dropped in HAVING), with no per-candidate subquery.
+    Returns None when the query has no usable token.
+    """
+    tokens = query_tokens(query)
+    if not tokens:
+        return None
+
+    queryset = queryset.filter(
+        reduce(operator.or_, (prefix_match(token, 'search_terms__term') for token in tokens)),
+        pk__in=candidate_ids(queryset, tokens),
+    )
+    token_scores = {
+        f'token{i}_score': token_score(token, F('search_terms__term'))
+        for i, token in enumerate(tokens)
+    }
+    queryset = queryset.annotate(**token_scores).filter(**{f'{name}__gt': 0 for name in token_scores})
+    return queryset.annotate(score=sum((F(name) for name in token_scores), Value(0)))
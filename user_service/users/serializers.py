@@ -1,57 +1,98 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.db import transaction
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .models import User, UserProfile
+from .hashing import hash_password
+from .tokens import UserRefreshToken
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = ('phone', 'address', 'city', 'country', 'postal_code')
 
-class UserSerializer(serializers.ModelSerializer):
-    profile = UserProfileSerializer(required=False)
-
-    class Meta:
-        model = User
-        fields = ('id', 'email', 'username', 'first_name', 'last_name', 'user_type', 'is_active', 'profile')
-        extra_kwargs = {'password': {'write_only': True}}
-
+class UserWriteMixin:
+    """
+    Shared write path for user serializers: one INSERT per table inside a
+    single transaction on create, and UPDATEs limited to the columns that
+    actually changed.
+    """
     def create(self, validated_data):
-        profile_data = validated_data.pop('profile', None)
+        profile_data = validated_data.pop('profile', None) or {}
         password = validated_data.pop('password', None)
-        
+
         user = User(**validated_data)
         if password:
-            user.set_password(password)
-        user.save()
-        
-        if profile_data:
-            UserProfile.objects.create(user=user, **profile_data)
+            user.password = hash_password(password)
         else:
-            UserProfile.objects.create(user=user)
-        
+            user.set_unusable_password()
+        with transaction.atomic():
+            user.save()
+            UserProfile.objects.create(user=user, **profile_data)
         return user
 
     def update(self, instance, validated_data):
         profile_data = validated_data.pop('profile', None)
         password = validated_data.pop('password', None)
-        
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        
+
+        changed = [
+            attr for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
         if password:
-            instance.set_password(password)
-        
-        instance.save()
-        
-        if profile_data:
-            profile = instance.profile
-            for attr, value in profile_data.items():
-                setattr(profile, attr, value)
-            profile.save()
-        
+            instance.password = hash_password(password)
+            changed.append('password')
+
+        with transaction.atomic():
+            if changed:
+                instance.save(update_fields=changed)
+            if profile_data:
+                update_profile(instance, profile_data)
         return instance
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
+
+def update_profile(user, profile_data):
+    """
+    Writes only the changed profile columns, creating the profile if missing.
+    """
+    try:
+        profile = user.profile
+    except UserProfile.DoesNotExist:
+        # User tạo từ admin/shell có thể chưa có profile
+        UserProfile.objects.create(user=user, **profile_data)
+        return
+
+    changed = [
+        attr for attr, value in profile_data.items()
+        if getattr(profile, attr) != value
+    ]
+    if changed:
+        for attr in changed:
+            setattr(profile, attr, profile_data[attr])
+        profile.save(update_fields=changed + ['updated_at'])
+
+class SparseFieldsMixin:
+    """
+    Accepts a `fields` argument listing which of the declared fields to
+    serialize; the others are dropped before any value is read.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class UserSerializer(SparseFieldsMixin, UserWriteMixin, serializers.ModelSerializer):
+    profile = UserProfileSerializer(required=False)
+
+    class Meta:
+        model = User
+        fields = ('id', 'email', 'username', 'first_name', 'last_name', 'user_type', 'is_active', 'profile')
+        extra_kwargs = {'password': {'write_only': True}}
+
+class UserRegistrationSerializer(UserWriteMixin, serializers.ModelSerializer):
     profile = UserProfileSerializer(required=False)
     password = serializers.CharField(write_only=True)
     
@@ -60,22 +101,15 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         fields = ('id', 'email', 'username', 'password', 'first_name', 'last_name', 'profile')
     
     def create(self, validated_data):
-        profile_data = validated_data.pop('profile', None)
-        user = User.objects.create_user(**validated_data)
-        user.user_type = 'CUSTOMER'  # Mặc định là customer khi đăng ký
-        user.save()
-        
-        if profile_data:
-        # Nếu đã có profile, chỉ cập nhật
-            if hasattr(user, 'profile'):
-                profile = user.profile
-                for attr, value in profile_data.items():
-                    setattr(profile, attr, value)
-                profile.save()
-            else:
-                # Nếu chưa có profile, tạo mới
-                UserProfile.objects.create(user=user, **profile_data)
-        return user
+        validated_data['user_type'] = 'CUSTOMER'  # Mặc định là customer khi đăng ký
+        validated_data['email'] = User.objects.normalize_email(validated_data['email'])
+        validated_data['username'] = User.normalize_username(validated_data['username'])
+        return super().create(validated_data)
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return UserRefreshToken.for_user(user)
 
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -87,7 +121,7 @@ class LoginSerializer(serializers.Serializer):
             return user
         raise serializers.ValidationError("Incorrect Credentials")
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsMixin, UserWriteMixin, serializers.ModelSerializer):
     profile = UserProfileSerializer(required=False)
     
     class Meta:
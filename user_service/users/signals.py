@@ -1,16 +1,32 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from .cache import invalidate_user
 from .models import User, UserProfile
+from .search import index_profile, index_user
+
+# Các cột của User được đưa vào bảng tìm kiếm
+SEARCH_USER_FIELDS = frozenset(['email', 'first_name', 'last_name', 'username'])
 
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Xoá user khỏi cache khi được cập nhật (kể cả bị khoá) hoặc bị xoá
     """
-    Tạo hoặc cập nhật UserProfile khi User được tạo hoặc cập nhật
+    invalidate_user(instance.pk)
+
+@receiver(post_save, sender=User)
+def index_user_search_terms(sender, instance, created, update_fields=None, **kwargs):
     """
-    if created:
-        UserProfile.objects.create(user=instance)
-    else:
-        try:
-            instance.profile.save()
-        except UserProfile.DoesNotExist:
-            UserProfile.objects.create(user=instance)
\ No newline at end of file
+    Cập nhật bảng tìm kiếm khi email/tên thay đổi (bỏ qua last_login, password...)
+    """
+    if update_fields is None or SEARCH_USER_FIELDS & set(update_fields):
+        index_user(instance, created)
+
+
+@receiver(post_save, sender=UserProfile)
+def index_profile_search_terms(sender, instance, created, update_fields=None, **kwargs):
+    if created and not instance.phone:
+        return
+    if update_fields is None or 'phone' in update_fields:
+        index_profile(instance, created)
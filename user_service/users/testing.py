@@ -0,0 +1,17 @@
+from django.test import override_settings
+
+
+class QueryBudgetTestMixin:
+    """
+    Mixin for test cases: requests fail with QueryBudgetExceeded as soon as a
+    view goes over its declared `query_budget`.
+    """
+    def setUp(self):
+        super().setUp()
+        strict = override_settings(QUERY_BUDGET_STRICT=True)
+        strict.enable()
+        self.addCleanup(strict.disable)
+
+    def assertWithinQueryBudget(self, response):
+        self.assertIn('X-Query-Budget', response, 'View does not declare a query_budget')
+        self.assertLessEqual(int(response['X-Query-Count']), int(response['X-Query-Budget']))
@@ -1,3 +1,738 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from user_service.mysql_pool import base as mysql_pool
+from user_service.mysql_pool.pool import ConnectionPool, PoolTimeout
+from .cache import get_cached_user
+from .export import PROFILE_COLUMNS, USER_COLUMNS
+from .middleware import QueryBudgetExceeded
+from .models import User, UserProfile
+from .renderers import FastJSONRenderer
+from .routers import ReplicaRouter, _use_replica, is_pinned
+from .testing import QueryBudgetTestMixin
+from .tokens import UserRefreshToken
+from .views import UserViewSet
 
-# Create your tests here.
+
+def create_user(email, user_type, **kwargs):
+    user = User.objects.create_user(
+        username=email.split('@')[0], email=email, password='secret-pass-123',
+        user_type=user_type, **kwargs
+    )
+    UserProfile.objects.get_or_create(user=user, defaults={'city': 'Hanoi'})
+    return user
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {UserRefreshToken.for_user(user).access_token}')
+    return client
+
+
+class UserQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = create_user('admin@example.com', 'ADMIN')
+        self.staff = create_user('staff@example.com', 'STAFF')
+        for i in range(3):
+            create_user(f'customer{i}@example.com', 'CUSTOMER')
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        client = client_for(self.admin)
+        client.get('/api/users/')  # nạp user vào cache xác thực
+        response = client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+        small = int(response['X-Query-Count'])
+
+        for i in range(3, 20):
+            create_user(f'customer{i}@example.com', 'CUSTOMER')
+        response = client.get('/api/users/')
+        self.assertEqual(len(response.data['results']), 22)
+        self.assertEqual(int(response['X-Query-Count']), small)
+
+    def test_staff_list_includes_profiles_within_budget(self):
+        response = client_for(self.staff).get('/api/users/')
+        self.assertWithinQueryBudget(response)
+        self.assertEqual({u['profile']['city'] for u in response.data['results']}, {'Hanoi'})
+
+    def test_retrieve_within_budget(self):
+        customer = User.objects.get(email='customer0@example.com')
+        response = client_for(self.admin).get(f'/api/users/{customer.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+
+    def test_exceeding_budget_fails(self):
+        with mock.patch.object(UserViewSet, 'query_budget', {'list': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                client_for(self.admin).get('/api/users/')
+
+
+def writes(queries, table):
+    return [
+        q['sql'] for q in queries
+        if q['sql'].startswith(('INSERT', 'UPDATE')) and f'"{table}"' in q['sql'].replace('`', '"')
+    ]
+
+
+class UserWritePathTests(TestCase):
+    def setUp(self):
+        self.admin = create_user('admin@example.com', 'ADMIN')
+
+    def test_register_inserts_each_row_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().post('/api/users/register/', {
+                'email': 'new@example.com', 'username': 'new', 'password': 'secret-pass-123',
+                'first_name': 'New', 'last_name': 'User', 'profile': {'city': 'Hue'},
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(writes(ctx.captured_queries, 'users')), 1)
+        self.assertEqual(len(writes(ctx.captured_queries, 'user_profiles')), 1)
+        user = User.objects.get(email='new@example.com')
+        self.assertEqual(user.user_type, 'CUSTOMER')
+        self.assertEqual(user.profile.city, 'Hue')
+
+    def test_update_writes_only_changed_columns(self):
+        staff = create_user('staff@example.com', 'STAFF')
+        with CaptureQueriesContext(connection) as ctx:
+            response = client_for(self.admin).patch(
+                f'/api/users/{staff.id}/', {'first_name': 'Changed'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        user_writes = writes(ctx.captured_queries, 'users')
+        self.assertEqual(len(user_writes), 1)
+        self.assertNotIn('"email"', user_writes[0].replace('`', '"'))
+        self.assertEqual(writes(ctx.captured_queries, 'user_profiles'), [])
+
+    def test_login_does_not_write_profiles(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().post('/api/users/login/', {
+                'email': 'admin@example.com', 'password': 'secret-pass-123',
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(writes(ctx.captured_queries, 'user_profiles'), [])
+
+
+class PasswordRehashTests(TestCase):
+    def test_login_rehashes_legacy_password(self):
+        user = create_user('legacy@example.com', 'CUSTOMER')
+        user.password = make_password('legacy-pass-123', hasher='pbkdf2_sha256')
+        user.save(update_fields=['password'])
+
+        response = APIClient().post('/api/users/login/', {
+            'email': 'legacy@example.com', 'password': 'legacy-pass-123',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, get_hasher('default').algorithm)
+        self.assertTrue(user.check_password('legacy-pass-123'))
+
+    def test_wrong_password_is_rejected(self):
+        create_user('someone@example.com', 'CUSTOMER')
+        response = APIClient().post('/api/users/login/', {
+            'email': 'someone@example.com', 'password': 'wrong-pass',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        self.customer = create_user('customer@example.com', 'CUSTOMER')
+
+    def test_verify_token_reads_claims_without_queries(self):
+        client = client_for(self.customer)
+        client.post('/api/users/verify-token/')  # nạp user vào cache
+        with self.assertNumQueries(0):
+            response = client.post('/api/users/verify-token/')
+        self.assertEqual(response.data, {
+            'id': self.customer.id, 'email': 'customer@example.com', 'user_type': 'CUSTOMER',
+        })
+
+    def test_deactivated_user_is_rejected(self):
+        client = client_for(self.customer)
+        self.assertEqual(client.post('/api/users/verify-token/').status_code, 200)
+        self.customer.is_active = False
+        self.customer.save(update_fields=['is_active'])
+        self.assertEqual(client.post('/api/users/verify-token/').status_code, 401)
+
+    def test_demoted_user_token_is_rejected(self):
+        admin = create_user('admin@example.com', 'ADMIN')
+        client = client_for(admin)
+        self.assertEqual(client.get('/api/users/').status_code, 200)
+        admin.user_type = 'CUSTOMER'
+        admin.save(update_fields=['user_type'])
+        self.assertEqual(client.get('/api/users/').status_code, 401)
+
+
+class UserPolicyTests(TestCase):
+    def setUp(self):
+        self.admin = create_user('admin@example.com', 'ADMIN')
+        self.manager = create_user('manager@example.com', 'MANAGER')
+        self.staff = create_user('staff@example.com', 'STAFF')
+        self.customer = create_user('customer@example.com', 'CUSTOMER')
+
+    def test_create_checks_target_role(self):
+        response = client_for(self.manager).post('/api/users/', {
+            'email': 'x@example.com', 'username': 'x', 'user_type': 'ADMIN',
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['detail'], 'Manager chỉ có thể tạo tài khoản STAFF, CUSTOMER')
+
+        response = client_for(self.manager).post('/api/users/', {
+            'email': 'x@example.com', 'username': 'x', 'user_type': 'STAFF',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_update_rules(self):
+        cases = [
+            (self.admin, self.staff, 200),
+            (self.admin, self.customer, 403),
+            (self.manager, self.admin, 403),
+            (self.manager, self.customer, 200),
+            (self.customer, self.customer, 200),
+        ]
+        for actor, target, expected in cases:
+            response = client_for(actor).patch(
+                f'/api/users/{target.id}/', {'first_name': 'Changed'}, format='json'
+            )
+            self.assertEqual(response.status_code, expected, (actor.user_type, target.user_type))
+
+    def test_customer_cannot_delete(self):
+        response = client_for(self.customer).delete(f'/api/users/{self.customer.id}/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['detail'], 'Customer không có quyền xóa tài khoản')
+
+    def test_staff_sees_only_customers(self):
+        response = client_for(self.staff).get('/api/users/')
+        self.assertEqual([u['email'] for u in response.data['results']], ['customer@example.com'])
+        response = client_for(self.staff).get(f'/api/users/{self.manager.id}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_customer_cannot_list(self):
+        self.assertEqual(client_for(self.customer).get('/api/users/').status_code, 403)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.pings = 0
+
+    def ping(self):
+        self.pings += 1
+        if self.closed:
+            raise OSError('gone away')
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_connections_are_reused(self):
+        pool = ConnectionPool(FakeConnection, size=2)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(pool.stats()['created'], 1)
+
+    def test_waits_then_times_out_when_exhausted(self):
+        pool = ConnectionPool(FakeConnection, size=1, timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        stats = pool.stats()
+        self.assertEqual((stats['in_use'], stats['waits'], stats['timeouts']), (1, 1, 1))
+
+    def test_dead_idle_connection_is_replaced(self):
+        pool = ConnectionPool(FakeConnection, size=1, ping_interval=0)
+        first = pool.acquire()
+        pool.release(first)
+        first.closed = True
+        second = pool.acquire()
+        self.assertIsNot(second, first)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_expired_connection_is_replaced(self):
+        pool = ConnectionPool(FakeConnection, size=1, max_lifetime=0)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIsNot(pool.acquire(), first)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """DatabaseWrapper của user_service.mysql_pool với driver giả, không cần MySQL."""
+    alias = 'pool-test'
+
+    def setUp(self):
+        self.connected = []
+        patcher = mock.patch.object(mysql_pool.Database, 'connect', side_effect=self.fake_connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(mysql_pool._pools.pop, self.alias, None)
+
+    def fake_connect(self, **params):
+        connection = FakeConnection()
+        connection.encoders = {bytes: bytes}
+        self.connected.append((params['database'], connection))
+        return connection
+
+    def wrapper(self, name):
+        settings_dict = {
+            'ENGINE': 'user_service.mysql_pool', 'NAME': name, 'USER': 'root', 'PASSWORD': '',
+            'HOST': 'db', 'PORT': '3306', 'OPTIONS': {}, 'POOL': {'SIZE': 2},
+        }
+        return mysql_pool.DatabaseWrapper(settings_dict, alias=self.alias)
+
+    def open(self, wrapper):
+        wrapper.connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        return wrapper.connection
+
+    def test_closed_connection_goes_back_to_pool(self):
+        wrapper = self.wrapper('app')
+        first = self.open(wrapper)
+        wrapper._close()
+        self.assertIs(self.open(self.wrapper('app')), first)
+        self.assertEqual([name for name, _ in self.connected], ['app'])
+        self.assertNotIn(bytes, first.encoders)
+
+    def test_changed_params_get_a_new_pool(self):
+        old = self.wrapper('app')
+        in_use = self.open(old)
+        idle_wrapper = self.wrapper('app')
+        idle = self.open(idle_wrapper)
+        idle_wrapper._close()
+        # Test runner đổi NAME sang test_*: connection mới phải dùng tham số mới
+        renamed = self.open(self.wrapper('test_app'))
+        self.assertEqual([name for name, _ in self.connected], ['app', 'app', 'test_app'])
+        self.assertTrue(idle.closed)
+        self.assertEqual(mysql_pool.pool_stats()[self.alias]['in_use'], 1)
+        # Connection của pool cũ được đóng khi trả về, không lẫn vào pool mới
+        old._close()
+        self.assertTrue(in_use.closed)
+        self.assertFalse(renamed.closed)
+
+
+@override_settings(REPLICA_DATABASES=['replica1', 'replica2'])
+class ReplicaRouterTests(SimpleTestCase):
+    def test_reads_use_replica_only_when_marked(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(User), 'default')
+        token = _use_replica.set(True)
+        try:
+            self.assertIn(router.db_for_read(User), {'replica1', 'replica2'})
+            self.assertEqual(router.db_for_write(User), 'default')
+        finally:
+            _use_replica.reset(token)
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReadYourWritesTests(TransactionTestCase):
+    # Connection của replica1 không thấy transaction đang mở của 'default',
+    # nên dữ liệu phải được commit thật thay vì rollback như TestCase
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        cache.clear()
+        self.staff = create_user('staff@example.com', 'STAFF')
+        self.customer = create_user('customer@example.com', 'CUSTOMER')
+
+    def list_aliases(self, user):
+        """Aliases the users table was read from while `user` listed users."""
+        # nạp user vào cache trước, để query xác thực không lẫn vào kết quả
+        get_cached_user(user.id)
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica1']) as replica:
+            response = client_for(user).get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.customer.id, [row['id'] for row in response.data['results']])
+        table = connection.ops.quote_name(User._meta.db_table)
+        return {
+            alias for alias, capture in (('default', primary), ('replica1', replica))
+            if any(f'FROM {table}' in query['sql'] for query in capture.captured_queries)
+        }
+
+    def test_list_reads_from_replica(self):
+        self.assertEqual(self.list_aliases(self.staff), {'replica1'})
+
+    def test_reads_stick_to_primary_after_write(self):
+        response = client_for(self.staff).patch(f'/api/users/{self.customer.id}/', {'first_name': 'An'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.list_aliases(self.staff), {'default'})
+        # user khác không bị ảnh hưởng
+        self.assertEqual(self.list_aliases(create_user('staff2@example.com', 'STAFF')), {'replica1'})
+
+    def test_verify_token_does_not_pin(self):
+        self.assertEqual(client_for(self.staff).post('/api/users/verify-token/').status_code, 200)
+        self.assertFalse(is_pinned(self.staff))
+        self.assertEqual(self.list_aliases(self.staff), {'replica1'})
+
+    @override_settings(READ_YOUR_WRITES_WINDOW=0)
+    def test_stickiness_expires(self):
+        client_for(self.staff).patch(f'/api/users/{self.customer.id}/', {'first_name': 'An'}, format='json')
+        self.assertEqual(self.list_aliases(self.staff), {'replica1'})
+
+
+class ImportUsersTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'users.csv')
+        with open(self.path, 'w') as f:
+            f.write('email,first_name,password,user_type,city\n')
+            for i in range(5):
+                f.write(f'legacy{i}@example.com,Legacy{i},pass-{i}-123,customer,Hanoi\n')
+        create_user('legacy0@example.com', 'CUSTOMER')
+
+    def run_import(self, *args):
+        call_command('import_users', self.path, '--workers=0', '--batch-size=2', *args, stdout=io.StringIO())
+
+    def test_imports_users_with_profiles_and_skips_existing(self):
+        self.run_import()
+        imported = User.objects.filter(email__startswith='legacy').exclude(email='legacy0@example.com')
+        self.assertEqual(imported.count(), 4)
+        self.assertEqual(UserProfile.objects.filter(user__in=imported, city='Hanoi').count(), 4)
+        self.assertTrue(imported.get(email='legacy3@example.com').check_password('pass-3-123'))
+
+    def test_existing_user_without_profile_is_left_alone(self):
+        # Ví dụ tài khoản tạo bằng createsuperuser: không có profile
+        admin = User.objects.create_user(
+            username='root', email='legacy1@example.com', password='secret-pass-123', user_type='ADMIN',
+        )
+        self.run_import()
+        self.assertFalse(UserProfile.objects.filter(user=admin).exists())
+        self.assertEqual(User.objects.filter(email__startswith='legacy').count(), 5)
+
+    def test_taken_username_is_renamed_instead_of_dropped(self):
+        other = create_user('other@example.com', 'CUSTOMER')
+        User.objects.filter(pk=other.pk).update(username='legacy3@example.com')
+        output = io.StringIO()
+        call_command('import_users', self.path, '--workers=0', '--batch-size=2', stdout=output)
+        renamed = User.objects.get(email='legacy3@example.com')
+        self.assertEqual(renamed.username, 'legacy3@example.com-2')
+        self.assertTrue(UserProfile.objects.filter(user=renamed, city='Hanoi').exists())
+        self.assertIn('Imported 4 of 5 rows', output.getvalue())
+        self.assertIn('1 renamed', output.getvalue())
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        path = os.path.join(os.path.dirname(self.path), 'users.jsonl')
+        with open(path, 'w') as f:
+            f.write(json.dumps({'email': 'good1@example.com'}) + '\n')
+            f.write(json.dumps({'first_name': 'No email'}) + '\n')
+            f.write('{not json\n')
+            f.write(json.dumps({'email': 'long@example.com', 'first_name': 'x' * 200}) + '\n')
+            f.write(json.dumps({'email': 'good2@example.com', 'city': 'Hue'}) + '\n')
+        output, errors = io.StringIO(), io.StringIO()
+        call_command('import_users', path, '--workers=0', '--batch-size=2', stdout=output, stderr=errors)
+        self.assertEqual(
+            set(User.objects.filter(email__startswith='good').values_list('email', flat=True)),
+            {'good1@example.com', 'good2@example.com'},
+        )
+        self.assertFalse(User.objects.filter(email='long@example.com').exists())
+        self.assertIn('Imported 2 of 5 rows', output.getvalue())
+        self.assertIn('3 skipped as invalid', output.getvalue())
+        self.assertEqual(
+            [line.split(':')[0] for line in errors.getvalue().splitlines()], ['Row 2', 'Row 3', 'Row 4'],
+        )
+
+    def test_resume_skips_checkpointed_rows(self):
+        with open(f'{self.path}.checkpoint', 'w') as f:
+            f.write('4')
+        self.run_import('--resume')
+        self.assertEqual(User.objects.filter(email__startswith='legacy').count(), 2)
+        self.run_import()  # chạy lại toàn bộ không tạo bản ghi trùng
+        self.assertEqual(User.objects.filter(email__startswith='legacy').count(), 5)
+
+
+class UserExportTests(TestCase):
+    def setUp(self):
+        self.staff = create_user('staff@example.com', 'STAFF')
+        for i in range(5):
+            create_user(f'customer{i}@example.com', 'CUSTOMER')
+
+    def export(self, output):
+        response = client_for(self.staff).get('/api/users/export/', {'output': output})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    @override_settings(USERS_EXPORT_CHUNK_SIZE=2)
+    def test_ndjson_streams_all_visible_users_in_chunks(self):
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        # Staff chỉ thấy customer, đủ 5 dòng dù đọc theo chunk 2
+        self.assertEqual([row['email'] for row in rows], [f'customer{i}@example.com' for i in range(5)])
+        self.assertEqual({row['profile']['city'] for row in rows}, {'Hanoi'})
+
+    def test_csv_has_header_and_rows(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('csv'))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['user_type'], 'CUSTOMER')
+
+    def test_empty_csv_still_has_header(self):
+        User.objects.filter(user_type='CUSTOMER').delete()
+        self.assertEqual(self.export('csv').splitlines(), [','.join(USER_COLUMNS + PROFILE_COLUMNS)])
+
+    def test_user_without_profile_exports_null_profile_like_the_api(self):
+        customer = User.objects.get(email='customer0@example.com')
+        UserProfile.objects.filter(user=customer).delete()
+        row = json.loads(self.export('ndjson').splitlines()[0])
+        api = client_for(self.staff).get(f'/api/users/{customer.id}/').json()
+        self.assertEqual((row['profile'], api['profile']), (None, None))
+        csv_row = list(csv.reader(io.StringIO(self.export('csv'))))[1]
+        self.assertEqual(csv_row[len(USER_COLUMNS):], [''] * len(PROFILE_COLUMNS))
+
+    def test_customer_cannot_export(self):
+        customer = User.objects.get(email='customer0@example.com')
+        self.assertEqual(client_for(customer).get('/api/users/export/').status_code, 403)
+
+
+class UserSearchTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = create_user('staff@example.com', 'STAFF', first_name='Lan')
+        self.an = create_user('nguyen.an@example.com', 'CUSTOMER', first_name='Nguyễn', last_name='An')
+        self.anh = create_user('anh.tran@example.com', 'CUSTOMER', first_name='Trần', last_name='Anh')
+        self.manager = create_user('an.manager@example.com', 'MANAGER', last_name='An')
+        self.anh.profile.phone = '+84 912 345 678'
+        self.anh.profile.save(update_fields=['phone'])
+
+    def search(self, q, user=None):
+        client = client_for(user or self.staff)
+        client.get('/api/users/search/', {'q': q})  # nạp user vào cache xác thực
+        response = client.get('/api/users/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+        return [row['email'] for row in response.data['results']]
+
+    def test_exact_token_ranks_before_prefix_and_role_scope_applies(self):
+        # Staff không thấy manager dù tên khớp
+        self.assertEqual(self.search('an'), ['nguyen.an@example.com', 'anh.tran@example.com'])
+
+    def test_every_token_must_match_without_accents(self):
+        self.assertEqual(self.search('nguyen an'), ['nguyen.an@example.com'])
+
+    def test_phone_and_email_prefix(self):
+        self.assertEqual(self.search('0912 345'), ['anh.tran@example.com'])
+        self.assertEqual(self.search('anh.tran@exa'), ['anh.tran@example.com'])
+
+    def test_rename_updates_index(self):
+        self.an.first_name = 'Minh'
+        self.an.save(update_fields=['first_name'])
+        self.assertEqual(self.search('minh'), ['nguyen.an@example.com'])
+        names = self.an.search_terms.filter(field='name').values_list('term', flat=True)
+        self.assertEqual(set(names), {'minh', 'an', 'nguyen'})  # 'nguyen' từ username
+
+    @override_settings(USERS_SEARCH_MAX_CANDIDATES=1)
+    def test_candidate_cap_keeps_exact_matches(self):
+        # Chỉ còn 1 ứng viên cho token 'an': user có term đúng bằng 'an' đứng đầu index
+        self.assertEqual(self.search('an'), ['nguyen.an@example.com'])
+
+    @override_settings(USERS_SEARCH_MAX_CANDIDATES=5)
+    def test_candidate_cap_applies_after_every_token_matches(self):
+        # Mỗi token riêng lẻ khớp nhiều hơn giới hạn, chỉ một user khớp cả hai
+        for i in range(10):
+            create_user(f'a{i}@example.com', 'CUSTOMER', first_name='Nguyễn', last_name=f'Zz{i}')
+            create_user(f'b{i}@example.com', 'CUSTOMER', first_name=f'Yy{i}', last_name='Văn')
+        create_user('target@example.com', 'CUSTOMER', first_name='Nguyễn', last_name='Văn')
+        self.assertEqual(self.search('nguyen van'), ['target@example.com'])
+
+    def test_query_without_usable_token_is_rejected(self):
+        response = client_for(self.staff).get('/api/users/search/', {'q': 'a'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.admin = create_user('admin@example.com', 'ADMIN', first_name='Admin')
+        self.client = client_for(self.admin)
+        self.client.get('/api/users/')  # nạp user vào cache xác thực
+
+    def list_users(self, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/users/', params)
+        self.assertEqual(response.status_code, 200)
+        select = [q['sql'] for q in ctx.captured_queries if '"users"' in q['sql'].replace('`', '"')][-1]
+        return response.data['results'], select.replace('`', '"')
+
+    def test_fields_trim_output_and_columns(self):
+        results, sql = self.list_users({'fields': 'id,email,first_name'})
+        self.assertEqual(results, [{'id': self.admin.id, 'email': 'admin@example.com', 'first_name': 'Admin'}])
+        self.assertNotIn('user_profiles', sql)
+        self.assertNotIn('"password"', sql)
+
+    def test_expand_profile_joins_profile(self):
+        results, sql = self.list_users({'fields': 'id', 'expand': 'profile'})
+        self.assertEqual(results[0]['profile']['city'], 'Hanoi')
+        self.assertEqual(set(results[0]), {'id', 'profile'})
+        self.assertIn('user_profiles', sql)
+
+    def test_default_representation_is_unchanged(self):
+        results, _ = self.list_users({})
+        self.assertIn('profile', results[0])
+        self.assertIn('user_type', results[0])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/users/', {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_empty_selection_is_rejected(self):
+        for fields in ('', ' , '):
+            self.assertEqual(self.client.get('/api/users/', {'fields': fields}).status_code, 400)
+
+    def test_retrieve_with_fields_checks_permission_without_extra_queries(self):
+        customer = create_user('customer@example.com', 'CUSTOMER')
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/users/{customer.id}/', {'fields': 'email'})
+        self.assertEqual(response.data, {'email': 'customer@example.com'})
+
+
+class FastReadPathTests(TestCase):
+    def setUp(self):
+        self.admin = create_user('admin@example.com', 'ADMIN')
+        create_user('nguyen@example.com', 'CUSTOMER', first_name='Nguyễn')
+        # User không có profile (ví dụ tạo bằng createsuperuser)
+        self.bare = User.objects.create_user(username='bare', email='bare@example.com', password='x')
+        self.client = client_for(self.admin)
+
+    def both_paths(self, url, params=None):
+        responses = []
+        for fast in (False, True):
+            with override_settings(USERS_FAST_SERIALIZATION=fast):
+                response = self.client.get(url, params or {})
+            self.assertEqual(response.status_code, 200)
+            responses.append(response.json())
+        return responses
+
+    def test_fast_path_matches_model_serializer(self):
+        for url, params in [
+            ('/api/users/', None),
+            ('/api/users/', {'fields': 'id,email', 'expand': 'profile'}),
+            (f'/api/users/{self.bare.id}/', None),
+            ('/api/users/search/', {'q': 'nguyen'}),
+        ]:
+            slow, fast = self.both_paths(url, params)
+            self.assertEqual(fast, slow, url)
+
+    def test_renderer_output_is_compact_utf8(self):
+        body = FastJSONRenderer().render({'name': 'Nguyễn', 'ids': [1, 2]})
+        self.assertEqual(body, '{"name":"Nguyễn","ids":[1,2]}'.encode())
+
+
+class ConditionalRetrieveTests(TestCase):
+    def setUp(self):
+        self.admin = create_user('admin@example.com', 'ADMIN')
+        self.customer = create_user('customer@example.com', 'CUSTOMER')
+        self.client = client_for(self.admin)
+        self.url = f'/api/users/{self.customer.id}/'
+
+    def test_matching_etag_returns_304_without_body(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_user_and_profile_writes_change_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.customer.first_name = 'Changed'
+        self.customer.save(update_fields=['first_name'])
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 200)
+        self.customer.profile.city = 'Hue'
+        self.customer.profile.save(update_fields=['city', 'updated_at'])
+        third = self.client.get(self.url, HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(third.data['profile']['city'], 'Hue')
+
+    def test_etag_differs_per_fieldset(self):
+        full = self.client.get(self.url)['ETag']
+        sparse = self.client.get(self.url, {'fields': 'email'})['ETag']
+        self.assertNotEqual(full, sparse)
+
+    def test_login_does_not_change_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        APIClient().post('/api/users/login/', {
+            'email': 'customer@example.com', 'password': 'secret-pass-123',
+        }, format='json')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.admin = create_user('admin@example.com', 'ADMIN')
+        self.client = client_for(self.admin)
+
+    def test_server_timing_reports_db_and_app_time(self):
+        response = self.client.get('/api/users/')
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{response["X-Query-Count"]} queries"', timing)
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+$')
+
+    def test_metrics_are_recorded_per_view(self):
+        self.client.get('/api/users/')
+        self.client.get(f'/api/users/{self.admin.id}/')
+        body = self.client.get('/metrics/').content.decode()
+        self.assertIn('user_service_requests_total{method="GET",status="200",view="user-list"}', body)
+        self.assertIn('user_service_request_duration_seconds_count{method="GET",view="user-detail"}', body)
+        self.assertIn('user_service_db_queries_bucket{le="+Inf",method="GET",view="user-list"}', body)
+        self.assertIn('# TYPE user_service_db_duration_seconds histogram', body)
+        self.assertIn('# TYPE user_service_db_pool_waits_total counter', body)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        profiling = override_settings(
+            PROFILING_DIR=self.tmp.name, PROFILING_KEEP=2, PROFILING_TOKEN='let-me-see', PROFILING_SAMPLE_RATE=0,
+        )
+        profiling.enable()
+        self.addCleanup(profiling.disable)
+        self.admin = create_user('admin@example.com', 'ADMIN')
+        self.client = client_for(self.admin)
+
+    def test_requests_are_only_profiled_with_the_token(self):
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/users/'))
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/users/', HTTP_X_PROFILE='wrong'))
+        profile_id = self.client.get('/api/users/', HTTP_X_PROFILE='let-me-see')['X-Profile-Id']
+
+        entries = self.client.get('/api/users/profiles/').data
+        self.assertEqual([(e['id'], e['action'], e['status']) for e in entries], [(profile_id, 'list', 200)])
+        summary = self.client.get(f'/api/users/profiles/{profile_id}/?sort=tottime')
+        self.assertEqual(summary['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertIn(b'function calls', summary.content)
+        download = self.client.get(f'/api/users/profiles/{profile_id}/?output=pstats')
+        self.assertIn('attachment', download['Content-Disposition'])
+        self.assertEqual(self.client.get('/api/users/profiles/1-deadbeef/').status_code, 404)
+
+    def test_ring_keeps_the_newest_profiles(self):
+        ids = [
+            self.client.get('/api/users/', HTTP_X_PROFILE='let-me-see')['X-Profile-Id']
+            for _ in range(3)
+        ]
+        entries = self.client.get('/api/users/profiles/').data
+        self.assertEqual([entry['id'] for entry in entries], ids[:0:-1])
+        self.assertEqual(len(os.listdir(self.tmp.name)), 4)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampling_and_admin_only_endpoint(self):
+        manager = create_user('manager@example.com', 'MANAGER')
+        self.assertIn('X-Profile-Id', client_for(manager).get('/api/users/'))
+        self.assertEqual(client_for(manager).get('/api/users/profiles/').status_code, 403)
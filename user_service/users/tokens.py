@@ -0,0 +1,13 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+class UserRefreshToken(RefreshToken):
+    """
+    Refresh token carrying `email` and `user_type` claims. Access tokens
+    derived from it copy them, so authentication needs no user lookup.
+    """
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['email'] = user.email
+        token['user_type'] = user.user_type
+        return token
\ No newline at end of file
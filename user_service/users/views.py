@@ -1,141 +1,53 @@
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from .conditional import ConditionalRetrieveMixin
+from .export import EXPORT_FORMATS, iter_chunks
+from .fastpath import FastReadMixin
+from .fieldsets import SparseFieldsetMixin
+from .metrics import CONTENT_TYPE_LATEST, render_metrics
 from .models import User
+from .pagination import UserSearchPagination
+from .search import search_users
+from .tokens import UserRefreshToken
 from .serializers import (
     UserSerializer, UserRegistrationSerializer,
     LoginSerializer, CustomerSerializer
 )
-from .permissions import (
-    IsAdminUser, IsManagerUser, IsStaffUser, 
-    IsCustomerUser, IsAdminOrManager, 
-    IsAdminOrManagerOrStaff, IsOwnerOrAdminOrStaff
-)
+from .permissions import user_permission, customer_permission
+from .profiling import SORT_KEYS, ProfilingMixin, profile_store
+from .policy import USER_POLICY, CUSTOMER_POLICY
+from .routers import ReplicaRoutingMixin
+from user_service.mysql_pool.base import pool_stats
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(
+    ProfilingMixin, ConditionalRetrieveMixin, FastReadMixin, SparseFieldsetMixin, ReplicaRoutingMixin,
+    viewsets.ModelViewSet,
+):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    # Số query tối đa cho mỗi action, kiểm tra bởi QueryBudgetMiddleware
+    # search: thêm một truy vấn lấy danh sách ứng viên (users/search.py)
+    query_budget = {'list': 2, 'retrieve': 2, 'verify_token': 1, 'search': 3}
     
     def get_permissions(self):
-        if self.action == 'create':
-            permission_classes = [IsAdminOrManager]
-        elif self.action in ['list', 'retrieve']:
-            permission_classes = [IsAdminOrManagerOrStaff]
-        elif self.action in ['update', 'partial_update', 'destroy']:
-            permission_classes = [IsOwnerOrAdminOrStaff]
-        elif self.action in ['register', 'login']:
-            permission_classes = [permissions.AllowAny]
-        elif self.action == 'verify_token':
-            permission_classes = [permissions.IsAuthenticated]
-        else:
-            permission_classes = [permissions.IsAuthenticated]
-        return [permission() for permission in permission_classes]
+        # Quyền theo vai trò được khai báo trong USER_POLICY (users/policy.py)
+        return [user_permission]
     
     def get_queryset(self):
-        user = self.request.user
-        # Admin, manager có thể xem tất cả user
-        if user.user_type in ['ADMIN', 'MANAGER']:
-            return User.objects.all()
-        # Staff chỉ có thể xem customer
-        elif user.user_type == 'STAFF':
-            return User.objects.filter(user_type='CUSTOMER')
-        # Customer chỉ có thể xem thông tin của chính mình
-        elif user.user_type == 'CUSTOMER':
-            return User.objects.filter(id=user.id)
-        return User.objects.none()
-    
-    def create(self, request, *args, **kwargs):
-        # Admin chỉ có thể tạo admin, manager, staff
-        # Manager chỉ có thể tạo staff, customer
-        user_type = request.data.get('user_type', 'CUSTOMER').upper()
-        
-        if request.user.user_type == 'ADMIN' and user_type not in ['ADMIN', 'MANAGER', 'STAFF']:
-            return Response(
-                {"detail": "Admin chỉ có thể tạo tài khoản ADMIN, MANAGER, STAFF"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        if request.user.user_type == 'MANAGER' and user_type not in ['STAFF', 'CUSTOMER']:
-            return Response(
-                {"detail": "Manager chỉ có thể tạo tài khoản STAFF, CUSTOMER"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        return super().create(request, *args, **kwargs)
-    
-    def update(self, request, *args, **kwargs):
-        instance = self.get_object()
-        
-        # Admin chỉ có thể chỉnh sửa thông tin admin, manager, staff
-        if request.user.user_type == 'ADMIN' and instance.user_type not in ['ADMIN', 'MANAGER', 'STAFF']:
-            return Response(
-                {"detail": "Admin chỉ có thể chỉnh sửa thông tin ADMIN, MANAGER, STAFF"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        # Manager chỉ có thể chỉnh sửa thông tin staff, customer
-        if request.user.user_type == 'MANAGER' and instance.user_type not in ['STAFF', 'CUSTOMER']:
-            return Response(
-                {"detail": "Manager chỉ có thể chỉnh sửa thông tin STAFF, CUSTOMER"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        # Staff chỉ có thể chỉnh sửa thông tin customer
-        if request.user.user_type == 'STAFF' and instance.user_type != 'CUSTOMER':
-            return Response(
-                {"detail": "Staff chỉ có thể chỉnh sửa thông tin CUSTOMER"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        # Customer chỉ có thể chỉnh sửa thông tin của chính mình
-        if request.user.user_type == 'CUSTOMER' and instance.id != request.user.id:
-            return Response(
-                {"detail": "Customer chỉ có thể chỉnh sửa thông tin của chính mình"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        return super().update(request, *args, **kwargs)
-    
-    def destroy(self, request, *args, **kwargs):
-        instance = self.get_object()
-        
-        # Admin chỉ có thể xóa thông tin admin, manager, staff
-        if request.user.user_type == 'ADMIN' and instance.user_type not in ['ADMIN', 'MANAGER', 'STAFF']:
-            return Response(
-                {"detail": "Admin chỉ có thể xóa thông tin ADMIN, MANAGER, STAFF"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        # Manager chỉ có thể xóa thông tin staff, customer
-        if request.user.user_type == 'MANAGER' and instance.user_type not in ['STAFF', 'CUSTOMER']:
-            return Response(
-                {"detail": "Manager chỉ có thể xóa thông tin STAFF, CUSTOMER"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        # Staff chỉ có thể xóa thông tin customer
-        if request.user.user_type == 'STAFF' and instance.user_type != 'CUSTOMER':
-            return Response(
-                {"detail": "Staff chỉ có thể xóa thông tin CUSTOMER"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        # Customer không có quyền xóa
-        if request.user.user_type == 'CUSTOMER':
-            return Response(
-                {"detail": "Customer không có quyền xóa tài khoản"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        return super().destroy(request, *args, **kwargs)
+        # Chỉ đọc các cột được yêu cầu (?fields=), join profile khi cần
+        users = self.with_fieldset(User.objects.all())
+        return USER_POLICY.filter_queryset(users, self.request.user)
     
     @action(detail=False, methods=['post'])
     def register(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = UserRefreshToken.for_user(user)
             return Response({
                 'user': UserSerializer(user).data,
                 'refresh': str(refresh),
@@ -148,7 +60,7 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data
-            refresh = RefreshToken.for_user(user)
+            refresh = UserRefreshToken.for_user(user)
             return Response({
                 'user': UserSerializer(user).data,
                 'refresh': str(refresh),
@@ -156,7 +68,7 @@ class UserViewSet(viewsets.ModelViewSet):
             })
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], url_path='verify-token')
     def verify_token(self, request):
         # Xác thực token là hợp lệ (sẽ được thực hiện bởi JWT middleware)
         return Response({
@@ -165,32 +77,80 @@ class UserViewSet(viewsets.ModelViewSet):
             'user_type': request.user.user_type
         })
 
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        # ?q=<một phần email, tên hoặc số điện thoại>, kết quả xếp theo độ khớp
+        users = search_users(self.get_queryset(), request.query_params.get('q'))
+        if users is None:
+            return Response(
+                {'detail': 'q must contain at least 2 letters or digits'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        paginator = UserSearchPagination()
+        page = paginator.paginate_queryset(users, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
-class CustomerViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        # ?output=ndjson (mặc định) hoặc ?output=csv; stream theo từng chunk để bộ nhớ không phụ thuộc số user
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'detail': f"output must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        content_type, render = EXPORT_FORMATS[output]
+        queryset = self.get_queryset()
+        # Chọn database ngay bây giờ: body được stream sau khi request đã kết thúc routing
+        queryset = queryset.using(queryset.db)
+        response = StreamingHttpResponse(
+            render(iter_chunks(queryset, settings.USERS_EXPORT_CHUNK_SIZE)),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="users.{output}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def profiles(self, request):
+        # Các profile CPU đã lưu (users/profiling.py), mới nhất trước
+        return Response(profile_store().list())
+
+    @action(detail=False, methods=['get'], url_path=r'profiles/(?P<profile_id>[\w-]+)')
+    def profile_detail(self, request, profile_id):
+        # ?output=text (mặc định): các hàm tốn thời gian nhất theo ?sort=; ?output=pstats: tải file gốc
+        store = profile_store()
+        output = request.query_params.get('output', 'text')
+        if output == 'pstats':
+            path = store.stats_path(profile_id)
+            if path is None:
+                return Response({'detail': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+            return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.prof')
+        sort = request.query_params.get('sort', 'cumulative')
+        if output != 'text' or sort not in SORT_KEYS:
+            return Response(
+                {'detail': f"output must be text or pstats, sort one of: {', '.join(SORT_KEYS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        summary = store.summary(profile_id, sort)
+        if summary is None:
+            return Response({'detail': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        return HttpResponse(summary, content_type='text/plain; charset=utf-8')
+
+
+class CustomerViewSet(
+    ConditionalRetrieveMixin, FastReadMixin, SparseFieldsetMixin, ReplicaRoutingMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = CustomerSerializer
+    query_budget = {'list': 2, 'retrieve': 2}
     
     def get_permissions(self):
-        if self.action == 'create':
-            permission_classes = [IsAdminOrManagerOrStaff]
-        elif self.action in ['list', 'retrieve']:
-            permission_classes = [IsAdminOrManagerOrStaff]
-        elif self.action in ['update', 'partial_update']:
-            permission_classes = [IsOwnerOrAdminOrStaff]
-        elif self.action == 'destroy':
-            permission_classes = [IsAdminOrManagerOrStaff]
-        else:
-            permission_classes = [permissions.IsAuthenticated]
-        return [permission() for permission in permission_classes]
+        return [customer_permission]
     
     def get_queryset(self):
-        user = self.request.user
-        # Admin, manager có thể xem tất cả customer
-        if user.user_type in ['ADMIN', 'MANAGER', 'STAFF']:
-            return User.objects.filter(user_type='CUSTOMER')
-        # Customer chỉ có thể xem thông tin của chính mình
-        elif user.user_type == 'CUSTOMER':
-            return User.objects.filter(id=user.id, user_type='CUSTOMER')
-        return User.objects.none()
+        users = self.with_fieldset(User.objects.filter(user_type='CUSTOMER'))
+        return CUSTOMER_POLICY.filter_queryset(users, self.request.user)
     
     def create(self, request, *args, **kwargs):
         request.data['user_type'] = 'CUSTOMER'
@@ -198,4 +158,20 @@ class CustomerViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def health_check(request):
+    return Response({
+        'status': 'healthy',
+        'service': 'user_service',
+        'db_pool': pool_stats(),
+    })
+
+@require_GET
+def metrics(request):
+    # Mỗi process có bộ đếm riêng, Prometheus scrape từng instance
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)